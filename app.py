@@ -2,16 +2,25 @@ import os
 import streamlit as st
 # Custom imports 
 from multipage import MultiPage
-from pages import android_app_market, home, investigating_netflix_movies, the_github_history_of_the_Scala_language
+import refresh
 
 # Create an instance of the app 
 app = MultiPage()
 
 # Add all your application here
-app.add_page("Profile", home.app)
-app.add_page("The Android App Market on Google Play", android_app_market.app)
-app.add_page("Investigating Netflix Movies and Guest Stars in The Office", investigating_netflix_movies.app)
-app.add_page("The GitHub History of the Scala Language", the_github_history_of_the_Scala_language.app)
+# Pages are given by module path so their dependencies are imported only when first opened
+app.add_page("Profile", "pages.home")
+app.add_page("The Android App Market on Google Play", "pages.android_app_market")
+app.add_page("Investigating Netflix Movies and Guest Stars in The Office", "pages.investigating_netflix_movies")
+app.add_page("The GitHub History of the Scala Language", "pages.the_github_history_of_the_Scala_language")
 
-# The main app
-app.run()
\ No newline at end of file
+# Fill the caches of every page in the background, once per process
+# (serve.py starts it at boot, before the first session runs this script)
+app.warm_up()
+
+# Rebuild the data of the pages in the background when a dataset changes
+refresh.watch()
+
+# The main app, when Streamlit runs this script (serve.py only imports it for its pages)
+if __name__ == '__main__':
+    app.run()
\ No newline at end of file
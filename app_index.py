@@ -0,0 +1,160 @@
+"""
+Bitmap and sorted-array indexes over the Google Play apps, for the filters of the Android page.
+
+Every category and type has a bitmap of its apps (one bit per row of the
+apps frame, packed in bytes), and the prices and ratings are kept as sorted
+arrays of row positions. A price or rating range is found by binary search,
+and any combination of filters is a few bitwise operations on the bitmaps.
+The filtered rows are only taken from the frame once the selection is known.
+"""
+
+# Import necessary libraries
+import numpy as np
+import pandas as pd
+
+from data_loader import cached, dataset_path, load_prepared
+from profiling import section
+
+# Number of set bits of each byte value
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype='int64')
+
+
+def _bitmaps(column) -> tuple:
+    """Sorted distinct values of a column and the bitmap of each of them (missing values left out)."""
+    codes, uniques = pd.factorize(column, sort=True)
+    bitmaps = [np.packbits(codes == code) for code in range(len(uniques))]
+    return list(uniques), dict(zip(uniques, bitmaps))
+
+
+def _sorted_positions(column) -> tuple:
+    """Values of a column in increasing order, and the row position of each (missing values left out)."""
+    values = column.to_numpy(dtype=float)
+    positions = np.flatnonzero(~np.isnan(values))
+    positions = positions[np.argsort(values[positions], kind='mergesort')]
+    return values[positions], positions
+
+
+class AppIndex:
+    """Category and type bitmaps, price and rating sorted arrays of the apps.
+
+    Args:
+        apps ([pd.DataFrame]): Apps with Category, Type, Price, Rating and Size columns
+    """
+    def __init__(self, apps) -> None:
+        self.apps = apps
+        self.size = len(apps)
+
+        self.categories, self._categories = _bitmaps(apps['Category'])
+        self.types, self._types = _bitmaps(apps['Type'])
+        self._present = {column: np.packbits(apps[column].notnull().to_numpy()) for column in ('Rating', 'Size')}
+        self._sorted = {column: _sorted_positions(apps[column]) for column in ('Price', 'Rating')}
+
+        # Selection of every app
+        self.all = np.packbits(np.ones(self.size, dtype=bool))
+
+    def _from_rows(self, rows) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def _union(self, bitmaps, names) -> np.ndarray:
+        selection = np.zeros_like(self.all)
+        for name in names:
+            if name in bitmaps:
+                selection = selection | bitmaps[name]
+        return selection
+
+    def category(self, *names) -> np.ndarray:
+        """Bitmap of the apps of any of these categories."""
+        return self._union(self._categories, names)
+
+    def type(self, *names) -> np.ndarray:
+        """Bitmap of the apps of any of these types ("Free", "Paid")."""
+        return self._union(self._types, names)
+
+    def present(self, column) -> np.ndarray:
+        """Bitmap of the apps with a value in a column ("Rating" or "Size")."""
+        return self._present[column]
+
+    def range(self, column, low=None, high=None, inclusive=True) -> np.ndarray:
+        """Bitmap of the apps whose value of a column is between two bounds, found by binary search.
+
+        Args:
+            column ([str]): "Price" or "Rating"
+
+            low ([float]): Lower bound, None for no bound
+
+            high ([float]): Upper bound, None for no bound
+
+            inclusive ([bool]): Whether the values equal to a bound are selected
+        """
+        values, positions = self._sorted[column]
+        start = 0 if low is None else np.searchsorted(values, low, side='left' if inclusive else 'right')
+        stop = len(values) if high is None else np.searchsorted(values, high, side='right' if inclusive else 'left')
+        return self._from_rows(positions[start:stop])
+
+    def bounds(self, column) -> tuple:
+        """Smallest and largest value of a column."""
+        values, _ = self._sorted[column]
+        return float(values[0]), float(values[-1])
+
+    def select(self, categories=(), types=(), price=None, rating=None) -> np.ndarray:
+        """Bitmap of the apps matching every given filter.
+
+        Args:
+            categories ([list]): Categories to keep, all when empty
+
+            types ([list]): Types to keep, all when empty
+
+            price ([tuple]): (lowest, highest) price to keep, None for any price
+
+            rating ([tuple]): (lowest, highest) rating to keep, None for any rating (even missing)
+        """
+        selection = self.all
+        if categories:
+            selection = selection & self.category(*categories)
+        if types:
+            selection = selection & self.type(*types)
+        if price is not None:
+            selection = selection & self.range('Price', *price)
+        if rating is not None:
+            selection = selection & self.range('Rating', *rating)
+        return selection
+
+    def count(self, selection) -> int:
+        """Number of apps of a selection."""
+        return int(_POPCOUNT[selection].sum())
+
+    def category_counts(self, selection) -> pd.Series:
+        """Number of apps of each category in a selection, leaving out the categories without any."""
+        counts = pd.Series({name: self.count(selection & bitmap) for name, bitmap in self._categories.items()},
+                           dtype='int64')
+        counts.index.name = counts.name = 'Category'
+        return counts[counts > 0]
+
+    def rows(self, selection) -> np.ndarray:
+        """Row positions of the apps of a selection, in the order of the frame."""
+        return np.flatnonzero(np.unpackbits(selection, count=self.size))
+
+    def view(self, selection) -> pd.DataFrame:
+        """Apps of a selection, the frame itself when every app is selected."""
+        if np.array_equal(selection, self.all):
+            return self.apps
+        return self.apps.iloc[self.rows(selection)]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the indexes (not the apps frame), for the cache accounting."""
+        bitmaps = list(self._categories.values()) + list(self._types.values()) + list(self._present.values())
+        arrays = [array for pair in self._sorted.values() for array in pair]
+        return int(sum(array.nbytes for array in bitmaps + arrays))
+
+
+def load_app_index() -> AppIndex:
+    """Indexes of the current apps, built once per process."""
+    def build():
+        apps = load_prepared('apps')
+        with section('aggregate'):
+            return AppIndex(apps)
+
+    return cached('app_index', [dataset_path('apps.csv')], build)
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of the apps.csv cleaning: the original per-character ``apply``
+loop against the vectorized rules of ``cleaning.clean_apps``.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_cleaning --scale 1 10 50
+"""
+
+# Import necessary libraries
+import argparse
+import time
+
+import pandas as pd
+
+import cleaning
+from data_loader import dataset_path
+
+
+def legacy_clean(apps_with_duplicates) -> pd.DataFrame:
+    """Cleaning as the Android page used to do it, kept as the reference."""
+    apps = apps_with_duplicates.drop_duplicates(subset="App").copy()
+
+    for col in ["Installs", "Price", "Content Rating"]:
+        for char in ["+", "$", ","]:
+            apps[col] = apps[col].apply(lambda x: x.replace(char,''))
+
+    apps["Installs"] = apps["Installs"].astype(float)
+    apps["Price"] = apps["Price"].astype(float)
+    return apps
+
+
+def scaled_apps(scale) -> pd.DataFrame:
+    """apps.csv repeated ``scale`` times, with unique app names so no copy is dropped as duplicate."""
+    apps = pd.read_csv(dataset_path('apps.csv'), index_col=0)
+    copies = []
+    for i in range(scale):
+        copy = apps.copy()
+        if i:
+            copy['App'] = copy['App'] + f' #{i}'
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def best_of(func, frame, repeat) -> float:
+    """Fastest of ``repeat`` runs of ``func(frame)``, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(frame)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 50],
+                        help='number of copies of apps.csv to clean')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measure (best is kept)')
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for scale in args.scale:
+        frame = scaled_apps(scale)
+
+        # Both versions must agree before their timings mean anything
+        expected = legacy_clean(frame)
+        result = cleaning.clean_apps(frame)
+        pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+
+        legacy = best_of(legacy_clean, frame, args.repeat)
+        vectorized = best_of(cleaning.clean_apps, frame, args.repeat)
+        print(f'{len(frame):>10} {legacy:>12.4f} {vectorized:>15.4f} {legacy / vectorized:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
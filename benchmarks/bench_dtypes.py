@@ -0,0 +1,62 @@
+"""
+Memory of every dataset with the default pandas dtypes and after
+``cleaning.compact``, and the time of a groupby on its categorical columns.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_dtypes --repeat 20
+"""
+
+# Import necessary libraries
+import argparse
+import os
+import time
+
+import pandas as pd
+
+import cleaning
+from data_loader import dataset_path, sizeof
+
+# Datasets read by the pages: file name -> read_csv keyword arguments
+DATASETS = {
+    'apps.csv': {'index_col': 0},
+    'netflix_data.csv': {},
+    'pulls_2011-2013.csv': {},
+    'pulls_2014-2018.csv': {},
+    'pull_files.csv': {},
+    'user_reviews.csv': {},
+}
+
+
+def best_of(func, repeat) -> float:
+    """Fastest of ``repeat`` runs of ``func()``, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help='runs per groupby timing (best is kept)')
+    args = parser.parse_args(argv)
+
+    print(f"{'dataset':<22} {'before (MB)':>12} {'after (MB)':>11} {'column':>16} {'groupby before (ms)':>20} {'after (ms)':>11}")
+    for name, read_kwargs in DATASETS.items():
+        if not os.path.exists(dataset_path(name)):
+            print(f'{name:<22} missing')
+            continue
+
+        frame = pd.read_csv(dataset_path(name), **read_kwargs)
+        compacted = cleaning.compact(frame)
+        print(f'{name:<22} {sizeof(frame) / 2 ** 20:>12.2f} {sizeof(compacted) / 2 ** 20:>11.2f}')
+
+        for column in compacted.select_dtypes('category'):
+            before = best_of(lambda: frame.groupby(column).size(), args.repeat)
+            after = best_of(lambda: compacted.groupby(column, observed=True).size(), args.repeat)
+            print(f"{'':<22} {'':>12} {'':>11} {column[:16]:>16} {before * 1000:>20.2f} {after * 1000:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""
+Load test of the app served by ``python serve.py``, with concurrent sessions.
+
+The app is started locally as the Procfile does, the warm-up of the pages
+starting at boot, then N sessions connect to its websocket like browsers and
+keep switching between the pages of the sidebar (picked at random, with a
+fixed seed per session). A render lasts from the rerun request to the end of
+the script, plus the download of its images. For every number of sessions it
+reports the p50/p95/p99 render times (overall and per page), the throughput,
+and the CPU and memory of the server process and of its child processes
+(figure renderers), read from /proc (Linux only).
+
+Before the measures, one session opens every page once so the caches are
+warm. With --cold it does not, and the warm-up at boot is disabled. The
+sessions need the websockets package (11 or later), which the app itself does
+not use.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_load --sessions 1 4 16 --duration 30
+    python -m benchmarks.bench_load --sessions 8 --json load.json
+"""
+
+# Import necessary libraries
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+from websockets.sync.client import connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.Selectbox_pb2 import Selectbox
+
+from benchmarks.bench_pages import PAGE_SELECTOR, ROOT
+
+# Newer Streamlit releases keep the selected option of a selectbox, older ones its index
+SELECT_BY_VALUE = 'raw_value' in Selectbox.DESCRIPTOR.fields_by_name
+
+# Seconds to wait for the server to answer its health check, and for a render
+START_TIMEOUT = 60
+RENDER_TIMEOUT = 300
+
+PERCENTILES = (50, 95, 99)
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+class Server:
+    """``python serve.py`` on a free local port, stopped on exit.
+
+    Args:
+        env ([dict]): Environment of the server process
+    """
+    def __init__(self, env) -> None:
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, 'serve.py', '--server.headless', 'true',
+             '--server.port', str(self.port), '--server.address', '127.0.0.1',
+             '--browser.gatherUsageStats', 'false'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.stream = self._wait()
+
+    def _wait(self) -> str:
+        """Wait for the server to be up and return the URL of its websocket."""
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'streamlit exited with code {self.process.returncode}')
+            # Endpoints of the current releases, then of the older ones
+            for health, stream in (('/_stcore/health', '/_stcore/stream'), ('/healthz', '/stream')):
+                try:
+                    if requests.get(self.url + health, timeout=1).ok:
+                        return f'ws://127.0.0.1:{self.port}{stream}'
+                except requests.RequestException:
+                    pass
+            time.sleep(0.2)
+        raise RuntimeError(f'streamlit did not answer within {START_TIMEOUT} s')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        return False
+
+
+def _children(pid) -> list:
+    """Processes started by ``pid``, recursively."""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as stat:
+                    # The command name may hold spaces, the fields after it don't
+                    parents.setdefault(int(stat.read().rsplit(')', 1)[1].split()[1]), []).append(int(entry))
+            except OSError:
+                continue
+    found, pending = [], [pid]
+    while pending:
+        children = parents.get(pending.pop(), [])
+        found.extend(children)
+        pending.extend(children)
+    return found
+
+
+def process_stats(pid) -> dict:
+    """CPU seconds, current and peak RSS (MB) of a process, None once it exited."""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status') as status:
+            memory = {line.split(':')[0]: int(line.split()[1]) / 1024 for line in status if line.startswith('Vm')}
+    except OSError:
+        return None
+    # utime and stime, the 14th and 15th fields of /proc/<pid>/stat
+    return {'cpu_seconds': (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS,
+            'rss_mb': memory.get('VmRSS', 0.0), 'peak_rss_mb': memory.get('VmHWM', 0.0)}
+
+
+def snapshot(server_pid) -> dict:
+    """Stats of the server process and of its children: pid -> stats."""
+    stats = {pid: process_stats(pid) for pid in [server_pid] + _children(server_pid)}
+    return {pid: value for pid, value in stats.items() if value is not None}
+
+
+class Session(threading.Thread):
+    """Browser-like session switching between the pages until a deadline.
+
+    Args:
+        server ([Server]): Server to connect to
+
+        seed ([int]): Seed of the pages picked
+
+        deadline ([float]): ``time.perf_counter()`` after which no render is started, None for a single tour
+
+        think ([float]): Seconds between the end of a render and the next page switch
+    """
+    def __init__(self, server, seed, deadline, think=0.0) -> None:
+        super().__init__(daemon=True)
+        self.server = server
+        self.random = random.Random(seed)
+        self.deadline = deadline
+        self.think = think
+        # (page, seconds, succeeded) of every render
+        self.renders = []
+        self.error = None
+
+    def run(self) -> None:
+        try:
+            with connect(self.server.stream, subprotocols=['streamlit'], max_size=None) as websocket, \
+                    requests.Session() as http:
+                # The first run shows the first page and gives the options of the page selector
+                selector = self._render(websocket, http, None)
+                pages = list(selector.options)
+                if self.deadline is None:
+                    # Every other page once, then back to the first one
+                    for page in pages[1:] + pages[:1]:
+                        self._render(websocket, http, (selector, page))
+                    return
+                while time.perf_counter() < self.deadline:
+                    self._render(websocket, http, (selector, self.random.choice(pages)))
+                    time.sleep(self.think)
+        except Exception as error:
+            self.error = repr(error)
+
+    def _render(self, websocket, http, choice):
+        """Run the script for a page and download its images; return the page selector."""
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        if choice is not None:
+            selector, page = choice
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = selector.id
+            if SELECT_BY_VALUE:
+                state.string_value = page
+            else:
+                state.int_value = list(selector.options).index(page)
+
+        start = time.perf_counter()
+        websocket.send(message.SerializeToString())
+        selector, images, succeeded = None, [], True
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(websocket.recv(timeout=RENDER_TIMEOUT))
+            kind = forward.WhichOneof('type')
+            if kind == 'script_finished':
+                succeeded = succeeded and forward.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY
+                break
+            if kind != 'delta' or forward.delta.WhichOneof('type') != 'new_element':
+                continue
+            element = forward.delta.new_element
+            element_kind = element.WhichOneof('type')
+            if element_kind == 'selectbox' and element.selectbox.label == PAGE_SELECTOR:
+                selector = element.selectbox
+            elif element_kind == 'imgs':
+                images.extend(image.url for image in element.imgs.imgs)
+            elif element_kind == 'exception':
+                succeeded = False
+
+        for url in images:
+            if url.startswith('/'):
+                succeeded = http.get(self.server.url + url, timeout=RENDER_TIMEOUT).ok and succeeded
+
+        page = choice[1] if choice is not None else selector.options[0] if selector else None
+        self.renders.append((page, time.perf_counter() - start, succeeded))
+        return selector
+
+
+def percentiles(seconds) -> dict:
+    """p50/p95/p99 of render times, in seconds."""
+    if not seconds:
+        return {f'p{p}': float('nan') for p in PERCENTILES}
+    return {f'p{p}': float(value) for p, value in zip(PERCENTILES, np.percentile(seconds, PERCENTILES))}
+
+
+def run_level(server, sessions, duration, think, seed) -> dict:
+    """Load the server with concurrent sessions for ``duration`` seconds and summarize the renders."""
+    before = snapshot(server.process.pid)
+    start = time.perf_counter()
+    workers = [Session(server, seed + i, start + duration, think) for i in range(sessions)]
+
+    # Peak memory of every process during the level, sampled while the sessions run
+    peaks, done = {}, threading.Event()
+
+    def sample():
+        while not done.wait(0.5):
+            for pid, stats in snapshot(server.process.pid).items():
+                peaks[pid] = max(peaks.get(pid, 0.0), stats['rss_mb'])
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    after = snapshot(server.process.pid)
+
+    renders = [render for worker in workers for render in worker.renders]
+    seconds = [elapsed for _, elapsed, succeeded in renders if succeeded]
+    by_page = {}
+    for page, elapsed, succeeded in renders:
+        if succeeded:
+            by_page.setdefault(page, []).append(elapsed)
+
+    processes = {}
+    for pid, stats in after.items():
+        cpu = stats['cpu_seconds'] - before.get(pid, {}).get('cpu_seconds', 0.0)
+        processes[str(pid)] = {
+            'role': 'server' if pid == server.process.pid else 'child',
+            'cpu_seconds': cpu, 'cpu_percent': 100 * cpu / wall,
+            'rss_mb': stats['rss_mb'], 'peak_rss_mb': max(peaks.get(pid, 0.0), stats['rss_mb']),
+        }
+
+    return {
+        'sessions': sessions,
+        'seconds': wall,
+        'renders': len(renders),
+        'errors': len(renders) - len(seconds) + sum(worker.error is not None for worker in workers),
+        'session_errors': [worker.error for worker in workers if worker.error],
+        'throughput': len(seconds) / wall,
+        **percentiles(seconds),
+        'pages': {page: {'renders': len(values), **percentiles(values)} for page, values in sorted(by_page.items())},
+        'processes': processes,
+    }
+
+
+def report(level) -> None:
+    print(f"{level['sessions']:>8} {level['renders']:>8} {level['errors']:>7} {level['throughput']:>10.2f} "
+          + ' '.join(f"{level[f'p{p}']:>8.3f}" for p in PERCENTILES))
+    for page, stats in level['pages'].items():
+        print(f"{'':>8} {stats['renders']:>8} {'':>7} {'':>10} "
+              + ' '.join(f"{stats[f'p{p}']:>8.3f}" for p in PERCENTILES) + f'  {page}')
+    for pid, stats in level['processes'].items():
+        print(f"{'':>8} {stats['role']:>8} {pid:>7} CPU {stats['cpu_seconds']:7.1f} s ({stats['cpu_percent']:5.1f}%)"
+              f"  RSS {stats['rss_mb']:7.1f} MB (peak {stats['peak_rss_mb']:.1f} MB)")
+    for error in level['session_errors']:
+        print(f"{'':>8} session failed: {error}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16],
+                        help='numbers of concurrent sessions, one measure each')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load per number of sessions')
+    parser.add_argument('--think', type=float, default=0.0, help='seconds a session waits between two pages')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the pages picked by the sessions')
+    parser.add_argument('--cold', action='store_true', help='measure without any warm-up of the pages')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = []
+    env = dict(os.environ, PORTFOLIO_WARMUP='0') if args.cold else dict(os.environ)
+    with Server(env) as server:
+        if not args.cold:
+            tour = Session(server, args.seed, None)
+            tour.run()
+            if tour.error:
+                print(f'Warming up failed: {tour.error}')
+                return 1
+
+        print(f"{'sessions':>8} {'renders':>8} {'errors':>7} {'renders/s':>10} "
+              + ' '.join(f"{f'p{p} (s)':>8}" for p in PERCENTILES))
+        for sessions in args.sessions:
+            level = run_level(server, sessions, args.duration, args.think, args.seed)
+            results.append(level)
+            report(level)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 1 if any(level['errors'] for level in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
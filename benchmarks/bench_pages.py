@@ -0,0 +1,239 @@
+"""
+Headless benchmark of every page registered in app.py, on the real datasets and
+on copies scaled to more rows.
+
+Each render runs app.py in a fresh process with the streamlit module replaced
+by ``headless.Recorder``, so the numbers include the page imports, the data
+loading and the figure rendering, but no browser. Per page and scale it reports
+the cold render (first of the process) and warm render (rerun) wall times, the
+peak traced Python allocations of a cold render, and the peak RSS.
+
+The scaled datasets are the real CSV files repeated, with their ids made
+unique per copy, written to a temporary folder (with their compiled artifacts)
+and served through PORTFOLIO_DATASET_DIR.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pages --scale 1 10 100 --save-baseline
+    python -m benchmarks.bench_pages --scale 1 10 100   # compared to the saved baseline
+"""
+
+# Import necessary libraries
+import argparse
+import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE = Path(__file__).with_name('baseline.json')
+
+# Label of the page selector of MultiPage.run
+PAGE_SELECTOR = 'My Projects'
+# Prefix of the line a worker process prints its result on
+RESULT_PREFIX = 'BENCH_RESULT '
+
+# Metrics compared with the baseline, lower is better
+METRICS = ['cold_seconds', 'warm_seconds', 'peak_traced_mb', 'max_rss_mb']
+
+# Columns made unique in every copy of a file, so no copy is dropped as a duplicate
+TEXT_KEYS = {'apps.csv': ['App'], 'user_reviews.csv': ['App'], 'netflix_data.csv': ['show_id']}
+ID_KEYS = {'pulls.csv': 'pid', 'pulls_2011-2013.csv': 'pid', 'pulls_2014-2018.csv': 'pid', 'pull_files.csv': 'pid'}
+# Larger than any real pull request id
+ID_OFFSET = 10 ** 10
+
+
+def scale_datasets(source, target, scale) -> None:
+    """Write every CSV file of ``source`` repeated ``scale`` times to ``target``, copy the other files."""
+    target.mkdir(parents=True, exist_ok=True)
+    for path in sorted(source.iterdir()):
+        if path.is_dir():
+            continue
+        if path.suffix != '.csv':
+            shutil.copy(path, target / path.name)
+            continue
+
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+        # Unnamed first column: row numbers written by pandas, continued in every copy
+        row_numbers = [column for column in frame.columns[:1] if column.startswith('Unnamed:')]
+        header = ['' if column in row_numbers else column for column in frame.columns]
+
+        for i in range(scale):
+            copy = frame.copy()
+            if i:
+                for column in row_numbers:
+                    copy[column] = (copy[column].astype('int64') + i * len(frame)).astype(str)
+                for column in TEXT_KEYS.get(path.name, []):
+                    copy[column] = copy[column] + f' #{i}'
+                if path.name in ID_KEYS:
+                    column = ID_KEYS[path.name]
+                    copy[column] = (copy[column].astype('int64') + i * ID_OFFSET).astype(str)
+            copy.to_csv(target / path.name, mode='w' if i == 0 else 'a', header=header if i == 0 else False, index=False)
+
+
+def _run(args, env) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def _result(process) -> dict:
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return {'error': (process.stderr.strip().splitlines() or ['no result'])[-1]}
+
+
+def _peak_rss_mb(profile) -> float:
+    """High watermark of the resident memory of this process.
+
+    ``ru_maxrss`` carries over the watermark of the parent across ``exec``, so
+    the one of the process memory (reset by ``exec``) is read when available.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2 ** 10
+    except OSError:
+        pass
+    return profile.max_rss_bytes / 2 ** 20
+
+
+def _render(title) -> object:
+    """Run app.py once with ``title`` selected and return the recorder."""
+    import headless
+
+    recorder = headless.install(choices={PAGE_SELECTOR: title})
+    runpy.run_path(str(ROOT / 'app.py'), run_name='__main__')
+    return recorder
+
+
+def worker(title, measure) -> dict:
+    """Render a page in this process: twice for the timings, once traced for the allocations."""
+    import profiling
+
+    result = {'page': title}
+    try:
+        if measure == 'memory':
+            _render(title)
+            result['peak_traced_mb'] = profiling.history[-1].peak_bytes / 2 ** 20
+            return result
+
+        start = time.perf_counter()
+        recorder = _render(title)
+        result['cold_seconds'] = time.perf_counter() - start
+        result['elements'] = len(recorder.elements)
+        result['sections'] = {name: seconds for name, (seconds, calls) in profiling.history[-1].sections.items()}
+
+        start = time.perf_counter()
+        _render(title)
+        result['warm_seconds'] = time.perf_counter() - start
+        result['max_rss_mb'] = _peak_rss_mb(profiling.history[-1])
+    except Exception as error:
+        result['error'] = repr(error)
+    return result
+
+
+def list_pages(env) -> list:
+    """Titles of the pages registered in app.py."""
+    process = _run(['-m', 'benchmarks.bench_pages', '--list'], env)
+    return _result(process).get('pages', [])
+
+
+def bench(title, env) -> dict:
+    """Timings and memory of a page, each measured in a fresh process."""
+    result = _result(_run(['-m', 'benchmarks.bench_pages', '--worker', title, '--measure', 'time'], env))
+    if 'error' not in result:
+        traced_env = dict(env, PORTFOLIO_TRACE_MEMORY='1')
+        memory = _result(_run(['-m', 'benchmarks.bench_pages', '--worker', title, '--measure', 'memory'], traced_env))
+        result.update(memory)
+    return result
+
+
+def compare(results, baseline, tolerance) -> list:
+    """Regressions of the results over the baseline, as (scale, page, metric, ratio)."""
+    regressions = []
+    for scale, pages in results.items():
+        for title, result in pages.items():
+            reference = baseline.get(scale, {}).get(title, {})
+            for metric in METRICS:
+                if result.get(metric) and reference.get(metric):
+                    ratio = result[metric] / reference[metric]
+                    if ratio > 1 + tolerance:
+                        regressions.append((scale, title, metric, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100],
+                        help='number of copies of the datasets (1 is the real datasets)')
+    parser.add_argument('--page', action='append', help='only benchmark the pages with these titles')
+    parser.add_argument('--baseline', type=Path, default=BASELINE, help='baseline results (JSON)')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative slowdown over the baseline reported as a regression')
+    parser.add_argument('--list', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', metavar='TITLE', help=argparse.SUPPRESS)
+    parser.add_argument('--measure', choices=['time', 'memory'], default='time', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        import headless
+        recorder = headless.install()
+        runpy.run_path(str(ROOT / 'app.py'), run_name='__main__')
+        print(RESULT_PREFIX + json.dumps({'pages': recorder.options.get(PAGE_SELECTOR, [])}))
+        return 0
+    if args.worker:
+        print(RESULT_PREFIX + json.dumps(worker(args.worker, args.measure)))
+        return 0
+
+    from data_loader import DATASET_DIR
+
+    results = {}
+    print(f"{'page':<45} {'scale':>5} {'cold (s)':>9} {'warm (s)':>9} {'traced (MB)':>12} {'RSS (MB)':>9}")
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory(prefix=f'bench_x{scale}_') as scaled_dir:
+            # Whole pages (on-demand sections included) are measured alone,
+            # without the background warm-up of the other pages
+            env = dict(os.environ, PORTFOLIO_WARMUP='0', PORTFOLIO_ON_DEMAND='0')
+            if scale > 1:
+                scale_datasets(Path(DATASET_DIR), Path(scaled_dir), scale)
+                env['PORTFOLIO_DATASET_DIR'] = scaled_dir
+                env.pop('PORTFOLIO_ARTIFACT_DIR', None)
+                # Scaled copies are benchmarked like a deployment: compiled beforehand
+                _run(['build_datasets.py'], env)
+
+            titles = [title for title in list_pages(env) if not args.page or title in args.page]
+            for title in titles:
+                result = bench(title, env)
+                results.setdefault(str(scale), {})[title] = result
+                if 'error' in result:
+                    print(f"{title[:45]:<45} {scale:>5} failed: {result['error']}")
+                    continue
+                print(f"{title[:45]:<45} {scale:>5} {result['cold_seconds']:>9.3f} {result['warm_seconds']:>9.3f} "
+                      f"{result.get('peak_traced_mb', float('nan')):>12.1f} {result['max_rss_mb']:>9.1f}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f'Saved baseline to {args.baseline}')
+        return 0
+    if not args.baseline.exists():
+        print(f'No baseline at {args.baseline}, run with --save-baseline to create it')
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for scale, title, metric, ratio in regressions:
+        print(f'Regression: {title} x{scale} {metric} is {ratio:.2f}x the baseline')
+    if not regressions:
+        print(f'No regression over {args.baseline} (tolerance {args.tolerance:.0%})')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Memory of several server processes holding the datasets, with the datasets
+published to a shared folder (PORTFOLIO_SHARED_DIR) or private to each process.
+
+Each worker process loads every prepared dataset and waits; the memory of all
+of them is then read from /proc (Linux only). The proportional set size (PSS)
+splits the shared pages between the processes that map them.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_shared --workers 4 --scale 10
+"""
+
+# Import necessary libraries
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_pages import ROOT, scale_datasets
+
+# Loads the datasets, reports it and waits to be told to exit
+WORKER = '''
+import os, sys
+import data_loader
+for name, (sources, build) in data_loader.PREPARED.items():
+    if all(os.path.exists(data_loader.dataset_path(source)) for source in sources):
+        data_loader.load_prepared(name)
+print('ready', flush=True)
+sys.stdin.read()
+'''
+
+
+def memory_mb(pid) -> dict:
+    """Memory of a process from /proc/<pid>/smaps_rollup, in MB."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def measure(workers, env) -> list:
+    """Memory of ``workers`` processes that loaded the datasets."""
+    processes = [subprocess.Popen([sys.executable, '-c', WORKER], cwd=ROOT, env=env, text=True,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+                 for _ in range(workers)]
+    try:
+        for process in processes:
+            process.stdout.readline()
+        return [memory_mb(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='number of server processes')
+    parser.add_argument('--scale', type=int, default=10, help='number of copies of the datasets')
+    args = parser.parse_args(argv)
+
+    from data_loader import DATASET_DIR
+
+    with tempfile.TemporaryDirectory(prefix='bench_shared_') as tmp:
+        datasets, shared, private = (os.path.join(tmp, folder) for folder in ('datasets', 'shared', 'private'))
+        scale_datasets(Path(DATASET_DIR), Path(datasets), args.scale)
+
+        env = dict(os.environ, PORTFOLIO_DATASET_DIR=datasets)
+        env.pop('PORTFOLIO_ARTIFACT_DIR', None)
+        modes = {
+            # Every process cleans the raw files on its own
+            'private': dict(env, PORTFOLIO_SHARED_DIR=private),
+            # Published once, mapped by every process
+            'shared': dict(env, PORTFOLIO_SHARED_DIR=shared),
+        }
+        subprocess.run([sys.executable, 'build_datasets.py'], cwd=ROOT, env=modes['shared'], check=True,
+                       stdout=subprocess.DEVNULL)
+
+        print(f"{'mode':<8} {'workers':>7} {'RSS/worker (MB)':>16} {'private/worker (MB)':>20} {'total PSS (MB)':>15}")
+        for mode, mode_env in modes.items():
+            memory = measure(args.workers, mode_env)
+            print(f"{mode:<8} {args.workers:>7} {sum(m['rss'] for m in memory) / len(memory):>16.1f} "
+                  f"{sum(m['private'] for m in memory) / len(memory):>20.1f} {sum(m['pss'] for m in memory):>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
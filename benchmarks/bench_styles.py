@@ -0,0 +1,68 @@
+"""
+Benchmark of the genre colors of the Netflix page: the original ``iterrows()``
+loop against ``styles.map_styles`` on synthetically enlarged catalogs.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_styles --scale 1 10 100
+"""
+
+# Import necessary libraries
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import dataset_path
+from pages.investigating_netflix_movies import GENRE_COLORS
+from styles import map_styles
+
+
+def legacy_colors(movies) -> list:
+    """Colors as the Netflix page used to compute them, kept as the reference."""
+    colors = []
+    for label,row in movies.iterrows():
+        if row["genre"] == "Children":
+            colors.append("red")
+        elif row["genre"] == "Documentaries":
+            colors.append("blue")
+        elif row["genre"] == "Stand-Up":
+            colors.append("green")
+        else:
+            colors.append("black")
+    return colors
+
+
+def synthetic_catalog(scale, seed=0) -> pd.DataFrame:
+    """Movies of netflix_data.csv resampled to ``scale`` times their number."""
+    netflix_df = pd.read_csv(dataset_path('netflix_data.csv'))
+    movies = netflix_df.loc[netflix_df['type'] == 'Movie', ['title', 'country', 'genre', 'release_year', 'duration']]
+    rows = np.random.default_rng(seed).integers(0, len(movies), len(movies) * scale)
+    return movies.iloc[rows].reset_index(drop=True)
+
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100],
+                        help='size of the catalog relative to the real one')
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'iterrows (s)':>13} {'map_styles (s)':>15} {'speedup':>9}")
+    for scale in args.scale:
+        movies = synthetic_catalog(scale)
+
+        expected, legacy = timed(legacy_colors, movies)
+        result, vectorized = timed(map_styles, movies['genre'], GENRE_COLORS, 'black')
+        assert list(result) == expected
+
+        print(f'{len(movies):>10} {legacy:>13.4f} {vectorized:>15.4f} {legacy / vectorized:>8.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+One-shot build step precompiling the cleaned datasets used by the pages.
+
+Usage:
+    python build_datasets.py [name ...]
+
+Every dataset of ``data_loader.PREPARED`` is built unless names are given.
+Datasets whose raw files are missing are skipped; the pages keep reading the
+raw CSV files for any dataset that could not be built.
+"""
+
+# Import necessary libraries
+import argparse
+import sys
+
+import data_loader
+import pull_store
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Precompile the cleaned datasets of the portfolio.')
+    parser.add_argument('names', nargs='*', help='datasets to build (all by default)')
+    parser.add_argument('--force', action='store_true', help='rebuild datasets that are up to date')
+    args = parser.parse_args(argv)
+
+    unknown = set(args.names) - set(data_loader.PREPARED)
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+
+    if data_loader.feather is None:
+        print('pyarrow is not installed, nothing to build')
+        return 1
+
+    failed = False
+    for name in args.names or sorted(data_loader.PREPARED):
+        if data_loader.is_fresh(name) and not args.force:
+            print(f'{name}: up to date')
+            continue
+        try:
+            path = data_loader.build_artifact(name)
+        except FileNotFoundError as error:
+            print(f'{name}: skipped, missing source {error.filename}')
+        except Exception as error:
+            failed = True
+            print(f'{name}: failed, {error!r}')
+        else:
+            before, after = data_loader.memory_report[name]
+            print(f'{name}: built {path} ({before / 2 ** 20:.1f} MB in memory, {after / 2 ** 20:.1f} MB compacted)')
+
+    # Year partitions of the pull requests, read by pull_store.load_store, built along with the pulls
+    if not args.names or 'pulls' in args.names:
+        if pull_store.is_published() and not args.force:
+            print('pull partitions: up to date')
+        elif data_loader.is_fresh('pulls'):
+            years = pull_store.publish(append=not args.force)
+            print(f"pull partitions: wrote {', '.join(map(str, years)) or 'no year'} to {pull_store.PARTITION_DIR}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Chunked ingestion of the user reviews, too large to be loaded at once.
+
+user_reviews.csv is read as a stream of chunks and reduced on the fly to
+per-app sketches (see ``ReviewSketches``), so the peak memory is bounded by
+the chunk size instead of the number of reviews. PORTFOLIO_CHUNKSIZE sets the
+number of rows per chunk. The apps themselves are summarized from the bitmap
+indexes of ``app_index``, built from the loaded apps frame.
+"""
+
+# Import necessary libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+import summaries
+from data_loader import cached, dataset_path
+from profiling import section
+
+# Rows per chunk; 0 for REVIEW_CHUNKSIZE (the default)
+CHUNKSIZE = int(os.environ.get('PORTFOLIO_CHUNKSIZE', '0'))
+
+
+def read_chunks(name, chunksize=None, **read_kwargs):
+    """Generator of the chunks of a CSV file of the datasets folder.
+
+    Args:
+        name ([str]): File name relative to the datasets folder
+
+        chunksize ([int]): Rows per chunk, ``CHUNKSIZE`` by default
+
+        read_kwargs: Keyword arguments forwarded to ``pd.read_csv``
+    """
+    yield from pd.read_csv(dataset_path(name), chunksize=chunksize or CHUNKSIZE, **read_kwargs)
+
+
+def consume(chunks, *aggregators):
+    """Feed every chunk to the aggregators and return them.
+
+    Args:
+        chunks: Iterable of DataFrames
+
+        aggregators: Objects with an ``update(chunk)`` method
+    """
+    for chunk in chunks:
+        for aggregator in aggregators:
+            aggregator.update(chunk)
+    return aggregators
+
+
+class Histogram:
+    """Fixed-bin histogram of a numeric column, ignoring missing values.
+
+    Args:
+        column ([str]): Column to bin
+
+        edges: Increasing bin edges, as for ``np.histogram``
+    """
+    def __init__(self, column, edges) -> None:
+        self.column = column
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype='int64')
+        # Sum of the values, for their mean
+        self.total = 0.0
+
+    def update(self, chunk) -> None:
+        values = chunk[self.column].dropna().to_numpy(dtype=float)
+        self.counts += np.histogram(values, self.edges)[0]
+        self.total += float(values.sum())
+
+    def quantile(self, q) -> float:
+        """Quantile estimated by interpolation inside the bins (NaN when empty), see ``summaries.binned_quantile``.
+
+        Args:
+            q ([float]): Quantile between 0 and 1
+        """
+        return summaries.binned_quantile(self.edges, self.counts, q)
+
+    def box_stats(self, label) -> dict:
+        """Statistics of a box plot, in the format of matplotlib's ``Axes.bxp`` (None when empty).
+
+        They follow the rules of the Plotly boxes, see ``summaries.binned_box_stats``.
+
+        Args:
+            label ([str]): Name of the box
+        """
+        stats = summaries.binned_box_stats(self.edges, self.counts)
+        if stats is None:
+            return None
+        return summaries.bxp_stats(stats, label, self.total / self.counts.sum())
+
+
+class GroupedHistogram:
+    """One ``Histogram`` of a column per value of a grouping column.
+
+    Args:
+        group ([str]): Grouping column
+
+        column ([str]): Column to bin
+
+        edges: Increasing bin edges, as for ``np.histogram``
+    """
+    def __init__(self, group, column, edges) -> None:
+        self.group = group
+        self.column = column
+        self.edges = edges
+        self.histograms = {}
+
+    def update(self, chunk) -> None:
+        for key, rows in chunk.groupby(self.group):
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.column, self.edges)
+            self.histograms[key].update(rows)
+
+    def box_stats(self) -> list:
+        """Box plot statistics of every group, in the format of matplotlib's ``Axes.bxp``."""
+        return [self.histograms[key].box_stats(key) for key in sorted(self.histograms)
+                if self.histograms[key].counts.any()]
+
+
+# Ratings go from 1 to 5 by steps of 0.1: one bin centered on each of them, so no value falls on an edge
+RATING_EDGES = np.linspace(0.95, 5.05, 42)
+# Polarities go from -1 to 1; coarse bins keep the sketch of an app smaller than its reviews
+POLARITY_EDGES = np.linspace(-1, 1, 41)
+
+
+class ReviewSketches:
+    """Sentiment polarity sketch of the reviews of every app: count, sum and histogram.
+
+    The sketch of an app is a row of the arrays, found through a hash index on
+    the app name. Sketches merge by addition, so the distribution of the
+    reviews of any set of apps is computed without joining the reviews with the
+    apps.
+
+    Args:
+        edges: Increasing bin edges of the polarity histograms
+    """
+    def __init__(self, edges=POLARITY_EDGES) -> None:
+        self.edges = np.asarray(edges, dtype=float)
+        # App name -> row of its sketch
+        self.index = {}
+        # Rows allocated ahead, doubled whenever new apps don't fit
+        self._counts = np.zeros((0, len(self.edges) - 1), dtype='int32')
+        self._sums = np.zeros(0)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Histogram of the reviews of each app, one row per app."""
+        return self._counts[:len(self.index)]
+
+    @property
+    def sums(self) -> np.ndarray:
+        """Sum of the polarities of the reviews of each app."""
+        return self._sums[:len(self.index)]
+
+    def _reserve(self, size) -> None:
+        if size <= len(self._sums):
+            return
+        capacity = max(size, 2 * len(self._sums))
+        counts = np.zeros((capacity, self._counts.shape[1]), dtype=self._counts.dtype)
+        counts[:len(self._counts)] = self._counts
+        sums = np.zeros(capacity)
+        sums[:len(self._sums)] = self._sums
+        self._counts, self._sums = counts, sums
+
+    def update(self, chunk) -> None:
+        chunk = chunk.dropna(subset=['Sentiment', 'Review', 'Sentiment_Polarity'])
+        codes, apps = pd.factorize(chunk['App'])
+        rows = np.array([self.index.setdefault(app, len(self.index)) for app in apps.tolist()], dtype='int64')
+        self._reserve(len(self.index))
+
+        values = chunk['Sentiment_Polarity'].to_numpy(dtype=float)
+        # Bins as np.histogram places the values, the last one including its right edge
+        bins = np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, self._counts.shape[1] - 1)
+        # Histograms of the apps of the chunk only, added to their sketches
+        width = self._counts.shape[1]
+        counts = np.bincount(codes * width + bins, minlength=len(apps) * width).reshape(len(apps), width)
+        self._counts[rows] += counts.astype(self._counts.dtype)
+        self._sums[rows] += np.bincount(codes, weights=values, minlength=len(apps))
+
+    def merge(self, apps, column='Sentiment_Polarity') -> Histogram:
+        """Histogram of the reviews of some apps, merged from their sketches.
+
+        Args:
+            apps: Names of the apps, those without reviews are ignored
+
+            column ([str]): Name of the histogram
+        """
+        rows = pd.Index(apps).map(self.index).dropna().to_numpy(dtype='int64')
+        histogram = Histogram(column, self.edges)
+        histogram.counts = self.counts[rows].sum(axis=0, dtype='int64')
+        histogram.total = float(self.sums[rows].sum())
+        return histogram
+
+    def by_group(self, groups) -> GroupedHistogram:
+        """Histograms of the reviews of each group of apps.
+
+        Args:
+            groups ([pd.Series]): Group of each app, indexed by app name
+        """
+        grouped = GroupedHistogram(groups.name, 'Sentiment_Polarity', self.edges)
+        for key, apps in groups.groupby(groups, observed=True):
+            grouped.histograms[key] = self.merge(apps.index)
+        return grouped
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the sketches, for the cache accounting."""
+        return int(self._counts.nbytes + self._sums.nbytes + sum(len(app) for app in self.index))
+
+
+# Rows per chunk of the single pass over the reviews when CHUNKSIZE is 0
+REVIEW_CHUNKSIZE = 20000
+
+
+def summarize_reviews(chunksize=None) -> ReviewSketches:
+    """Polarity sketches of the apps of user_reviews.csv, in one pass over chunks of the file (None if missing).
+
+    Args:
+        chunksize ([int]): Rows per chunk, ``CHUNKSIZE`` (or ``REVIEW_CHUNKSIZE``) by default
+    """
+    path = dataset_path('user_reviews.csv')
+    if not os.path.exists(path):
+        return None
+
+    def build():
+        chunks = read_chunks('user_reviews.csv', chunksize or CHUNKSIZE or REVIEW_CHUNKSIZE,
+                             usecols=['App', 'Review', 'Sentiment', 'Sentiment_Polarity'])
+        with section('aggregate'):
+            return consume(chunks, ReviewSketches())[0]
+
+    return cached('review_sketches', [path], build, (chunksize or CHUNKSIZE,))
+
+
+def summarize_sentiment(app_types, chunksize=None) -> GroupedHistogram:
+    """Sentiment polarity histograms of the reviews of paid and free apps (None without reviews).
+
+    The per-app sketches of ``summarize_reviews`` are merged per Type, so the
+    reviews are never joined with the apps.
+
+    Args:
+        app_types ([pd.Series]): Type ("Free" / "Paid") of each app, indexed by app name
+
+        chunksize ([int]): Rows per chunk of the reviews, ``CHUNKSIZE`` by default
+    """
+    sketches = summarize_reviews(chunksize)
+    if sketches is None:
+        return None
+    with section('aggregate'):
+        return sketches.by_group(app_types.rename('Type'))
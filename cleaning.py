@@ -0,0 +1,135 @@
+"""
+Cleaning steps turning the raw CSV files into the frames used by the pages.
+
+These transforms are run once by ``build_datasets.py`` and their results stored
+as typed columnar files, so the pages don't repeat them on every render.
+"""
+
+# Import necessary libraries
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+# Bump when the output of a transform changes, so previously built artifacts are rebuilt
+VERSION = 2
+
+# String columns with at most this share of distinct values are stored as categoricals
+CATEGORY_RATIO = 0.5
+
+
+class Rule:
+    """Declarative cleaning rule for one column, applied to the whole column at once.
+
+    Args:
+        strip ([str]): Characters removed from every value, in a single ``str.translate`` pass
+
+        dtype: Type the column is converted to after stripping (None keeps strings);
+            values that can't be converted to a number become NaN
+
+        parse: Function taking and returning the whole column, used instead of strip/dtype
+    """
+    def __init__(self, strip='', dtype=None, parse=None) -> None:
+        self.table = str.maketrans('', '', strip)
+        self.dtype = dtype
+        self.parse = parse
+
+    def apply(self, column) -> pd.Series:
+        # Already typed columns (e.g. Size in apps.csv) have nothing left to clean
+        if pd.api.types.is_numeric_dtype(column):
+            return column
+
+        # These columns have few distinct values: clean each of them once, in a single
+        # vectorized pass, and broadcast the results back to the rows with their codes
+        codes, uniques = pd.factorize(column)
+        uniques = pd.Series(uniques)
+
+        if self.parse is not None:
+            cleaned = self.parse(uniques)
+        else:
+            cleaned = uniques.str.translate(self.table)
+            if self.dtype in (int, float):
+                cleaned = pd.to_numeric(cleaned, errors='coerce')
+
+        values = take(np.asarray(cleaned), codes, allow_fill=True)
+        result = pd.Series(values, index=column.index, name=column.name)
+        return result if self.dtype is None else result.astype(self.dtype)
+
+
+def parse_size(column) -> pd.Series:
+    """Sizes such as "19M" or "201k" in megabytes; NaN for "Varies with device"."""
+    parts = column.str.extract(r'^\s*([\d.]+)\s*([kKMG]?)\s*$')
+    factor = parts[1].map({'k': 1 / 1024, 'K': 1 / 1024, 'M': 1.0, 'G': 1024.0, '': 1.0})
+    return pd.to_numeric(parts[0], errors='coerce') * factor.astype(float)
+
+
+def apply_rules(frame, rules) -> pd.DataFrame:
+    """New frame with each column of ``rules`` cleaned by its rule.
+
+    Args:
+        frame ([pd.DataFrame]): Frame to clean, left untouched
+
+        rules ([dict]): Column name -> ``Rule``
+    """
+    return frame.assign(**{col: rule.apply(frame[col]) for col, rule in rules.items()})
+
+
+# Cleaning of apps.csv: "10,000+" installs, "$4.99" prices, "Mature 17+" ratings, "19M" sizes
+APPS_RULES = {
+    "Installs": Rule(strip="+$,", dtype=float),
+    "Price": Rule(strip="+$,", dtype=float),
+    "Content Rating": Rule(strip="+$,"),
+    "Size": Rule(parse=parse_size),
+}
+
+
+def clean_apps(apps_with_duplicates) -> pd.DataFrame:
+    """Google Play apps without duplicates and with numeric Installs, Price and Size.
+
+    Args:
+        apps_with_duplicates ([pd.DataFrame]): Raw content of apps.csv
+    """
+    # Drop duplicates from apps_with_duplicates
+    apps = apps_with_duplicates.drop_duplicates(subset="App")
+
+    return apply_rules(apps, APPS_RULES)
+
+
+def prepare_pulls(pulls_one, pulls_two) -> pd.DataFrame:
+    """Pull requests of both periods in a single frame with parsed dates.
+
+    Args:
+        pulls_one ([pd.DataFrame]): Raw content of pulls_2011-2013.csv
+
+        pulls_two ([pd.DataFrame]): Raw content of pulls_2014-2018.csv
+    """
+    # Append pulls_one to pulls_two
+    pulls = pd.concat([pulls_one, pulls_two], ignore_index=True)
+
+    # Convert the date for the pulls object
+    pulls['date'] = pd.to_datetime(pulls['date'], utc=True)
+
+    return pulls
+
+
+def compact(frame) -> pd.DataFrame:
+    """Same frame with the smallest lossless dtypes: categoricals for repetitive strings, downcast numbers.
+
+    Groupbys on a categorical column run on its integer codes; they must pass
+    ``observed=True`` to leave out the categories without rows.
+
+    Args:
+        frame ([pd.DataFrame]): Frame to compact, left untouched
+    """
+    columns = {}
+    for name, column in frame.items():
+        if pd.api.types.is_string_dtype(column) and not isinstance(column.dtype, pd.CategoricalDtype):
+            if column.nunique() <= CATEGORY_RATIO * len(column):
+                columns[name] = column.astype('category')
+        elif pd.api.types.is_integer_dtype(column):
+            columns[name] = pd.to_numeric(column, downcast='integer')
+        elif pd.api.types.is_float_dtype(column):
+            downcast = pd.to_numeric(column, downcast='float')
+            # Only when every value survives, e.g. "10,000+" installs but not 4.1 ratings
+            if np.array_equal(downcast.to_numpy(dtype=float), column.to_numpy(dtype=float), equal_nan=True):
+                columns[name] = downcast
+    return frame.assign(**columns)
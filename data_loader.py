@@ -0,0 +1,468 @@
+"""
+Shared data-access layer for the datasets used by the pages.
+
+Streamlit re-executes a page's ``app()`` function on every widget interaction,
+so calling ``pd.read_csv`` there re-parses the file on every rerun of every
+session. Frames loaded through this module are parsed once per process and
+shared by all sessions; they must be treated as read-only by the pages.
+
+Cleaned datasets are precompiled by ``build_datasets.py`` into Feather files
+under ``pages/datasets/compiled``. ``load_prepared`` reads those when they are
+newer than their raw sources and otherwise cleans the raw CSV files itself.
+
+Loaded frames get compact dtypes (see ``cleaning.compact``), and the memory
+they take before and after is kept in ``memory_report``.
+
+To run several server processes, set PORTFOLIO_SHARED_DIR (e.g. to
+/dev/shm/portfolio) for all of them and run ``build_datasets.py`` once before
+starting them: the datasets are published there, and every process maps the
+same files. Their numeric columns are read without copies, so the pages of
+all the processes share a single copy of them.
+
+Objects are cached per published version of their source files. When files
+change, the sessions keep getting the objects of the previous version while
+every cached object derived from the changed files is rebuilt in a background
+thread; the new versions of the files are then published at once, with all
+of these objects (see ``refresh.py`` for the watcher of the datasets folder).
+A script run reads the versions published when it started (see ``pinned``),
+so it never mixes objects built from different versions of the files.
+"""
+
+# Import necessary libraries
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+import pandas as pd
+
+import cleaning
+from profiling import section
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # pragma: no cover - the raw CSV files are cleaned on load instead
+    pa = feather = None
+
+logger = logging.getLogger(__name__)
+
+# Folder holding the raw datasets, relative to the app root
+DATASET_DIR = os.environ.get('PORTFOLIO_DATASET_DIR', os.path.join('.', 'pages', 'datasets'))
+
+# Folder the datasets are published to for several server processes, e.g. /dev/shm/portfolio
+SHARED_DIR = os.environ.get('PORTFOLIO_SHARED_DIR')
+
+# Folder holding the precompiled (cleaned and typed) datasets
+ARTIFACT_DIR = os.environ.get('PORTFOLIO_ARTIFACT_DIR', SHARED_DIR or os.path.join(DATASET_DIR, 'compiled'))
+
+# Upper bound (in bytes) of the memory held by the cached objects
+MAX_CACHE_BYTES = int(float(os.environ.get('PORTFOLIO_CACHE_MB', '256')) * 1024 * 1024)
+
+# Cache entries in least-recently-used order: key -> (value, size in bytes)
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+# One lock per key so concurrent sessions wait for a single parse instead of repeating it
+_build_locks = {}
+
+# Memory of the compacted datasets: name -> (bytes before, bytes after)
+memory_report = {}
+
+# Serve the previous version of the objects whose sources changed while they are rebuilt in the background
+BACKGROUND_REFRESH = os.environ.get('PORTFOLIO_BACKGROUND_REFRESH', '1') not in ('', '0')
+REFRESH_THREAD_PREFIX = 'portfolio-refresh'
+
+# How to rebuild each cached object: (name, params) -> (sources, build)
+_builders = {}
+# Published version of every source file seen so far: path -> mtime
+_versions = {}
+# Versions served to the current thread instead of the published ones: a script run or a rebuild
+_pinned = threading.local()
+# Background rebuild: (versions being built, future), one attempt per set of versions
+_pending_refresh = None
+_refresh_pool = None
+
+
+def dataset_path(name) -> str:
+    """Absolute path of a file stored in the datasets folder.
+
+    Args:
+        name ([str]): File name relative to the datasets folder
+    """
+    return os.path.abspath(os.path.join(DATASET_DIR, name))
+
+
+def sizeof(value) -> int:
+    """Estimated memory footprint (in bytes) of a cached value."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    # NumPy arrays and other buffers
+    return int(getattr(value, 'nbytes', 0))
+
+
+def _source_stamp(paths) -> tuple:
+    """Pairs of (path, mtime) identifying the version of the source files served to the current thread.
+
+    Without background refresh, it is the current version of the files. Otherwise a
+    file keeps the version it was first seen with until a new one is published by
+    the background rebuild, scheduled here when the file is found changed.
+    """
+    live = tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+    if not BACKGROUND_REFRESH:
+        return live
+
+    pinned = getattr(_pinned, 'versions', None)
+    stamp, changed = [], False
+    with _cache_lock:
+        for path, mtime in live:
+            if pinned is not None and path in pinned:
+                version = pinned[path]
+            else:
+                version = _versions.setdefault(path, mtime)
+            changed = changed or version != mtime
+            stamp.append((path, version))
+
+    if changed and not getattr(_pinned, 'rebuilding', False):
+        refresh_stale()
+    return tuple(stamp)
+
+
+def _is_published(key) -> bool:
+    """Whether a cache entry was built from the published version of its sources (lock held)."""
+    return all(_versions.get(path, mtime) == mtime for path, mtime in key[2])
+
+
+def _store(key, value) -> None:
+    """Insert a value in the cache and evict the least recently used entries over budget."""
+    global _cache_bytes
+
+    size = sizeof(value)
+    if size > MAX_CACHE_BYTES:
+        # Too big to be cached at all, the caller keeps its own copy
+        return
+
+    with _cache_lock:
+        # Drop the entries built from older versions of the same sources; a version
+        # being rebuilt is only stored next to the one the sessions are served
+        if _is_published(key):
+            for old_key in [k for k in _cache if k[:2] == key[:2] and k != key]:
+                _cache_bytes -= _cache.pop(old_key)[1]
+        elif not getattr(_pinned, 'rebuilding', False):
+            # A run pinned before the last publication, the object is not cached any more
+            return
+
+        _cache[key] = (value, size)
+        _cache_bytes += size
+
+        while _cache_bytes > MAX_CACHE_BYTES:
+            _, (_, old_size) = _cache.popitem(last=False)
+            _cache_bytes -= old_size
+
+
+def cached(name, sources, build, params=()):
+    """Return the cached result of ``build()``, rebuilding it when a source file changes.
+
+    Args:
+        name ([str]): Identifier of the cached object
+
+        sources ([list]): Paths of the files the object is derived from
+
+        build: Function without arguments returning the object to cache
+
+        params ([tuple]): Extra hashable values that distinguish variants of the object
+    """
+    key = (name, params, _source_stamp(sources))
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key][0]
+        _builders[key[:2]] = (sources, build)
+        build_lock = _build_locks.setdefault((name, params), threading.Lock())
+
+    with build_lock:
+        # Another session may have built it while we were waiting
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key][0]
+
+        value = build()
+        _store(key, value)
+        return value
+
+
+def previous_version(name, params=()):
+    """Cached value of an object built from the previous version of its sources, None if there is none.
+
+    Called by the ``build`` function of an object to update its previous value
+    instead of building it from scratch. The value is shared with the sessions
+    still served the previous version, so it must be copied, not modified.
+
+    Args:
+        name ([str]): Identifier of the cached object
+
+        params ([tuple]): Extra hashable values that distinguish variants of the object
+    """
+    with _cache_lock:
+        for key in reversed(_cache):
+            if key[:2] == (name, params) and _is_published(key):
+                return _cache[key][0]
+    return None
+
+
+@contextmanager
+def pinned():
+    """Serve the current thread the versions of the datasets published now, e.g. for a whole script run."""
+    with _cache_lock:
+        _pinned.versions = dict(_versions)
+    try:
+        yield
+    finally:
+        _pinned.versions = None
+
+
+def _refresh(versions, builders) -> None:
+    """Rebuild objects from new versions of their sources, then publish these versions with them."""
+    global _cache_bytes
+
+    _pinned.versions, _pinned.rebuilding = versions, True
+    try:
+        # Dependencies are rebuilt first by the nested calls, and stored next to their previous version
+        for (name, params), (sources, build) in builders:
+            cached(name, sources, build, params)
+    except Exception:
+        logger.exception('Refreshing the datasets failed, the previous version is kept')
+        versions = None
+    finally:
+        _pinned.versions, _pinned.rebuilding = None, False
+
+    with _cache_lock:
+        if versions is not None:
+            _versions.update(versions)
+        # Drop the previous version of the objects, or the new one when the rebuild failed
+        for key in [k for k in _cache if not _is_published(k)]:
+            _cache_bytes -= _cache.pop(key)[1]
+    if versions is not None:
+        logger.info('Refreshed %s', ', '.join(sorted(str(name) for (name, _), _ in builders)) or 'no cached object')
+
+
+def refresh_stale() -> list:
+    """Rebuild in the background the cached objects whose source files changed; return their names.
+
+    The new versions of the files are published once all of these objects are
+    rebuilt, so the sessions switch to them together.
+    """
+    global _pending_refresh, _refresh_pool
+
+    with _cache_lock:
+        changed = {}
+        for path, version in _versions.items():
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                # Being replaced, or removed: the previous version is kept
+                continue
+            if mtime != version:
+                changed[path] = mtime
+
+        versions = {**_versions, **changed}
+        if not changed or (_pending_refresh is not None and _pending_refresh[0] == versions):
+            return []
+
+        cached_idents = {key[:2] for key in _cache}
+        builders = [(ident, builder) for ident, builder in _builders.items()
+                    if ident in cached_idents and not changed.keys().isdisjoint(builder[0])]
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(1, thread_name_prefix=REFRESH_THREAD_PREFIX)
+        _pending_refresh = (versions, _refresh_pool.submit(_refresh, versions, builders))
+
+    return [name for (name, _), _ in builders]
+
+
+def _compacted(name, frame) -> pd.DataFrame:
+    """Frame with compact dtypes, recording the memory it saves."""
+    with section('clean'):
+        compacted = cleaning.compact(frame)
+
+    before, after = sizeof(frame), sizeof(compacted)
+    memory_report[name] = (before, after)
+    logger.info('Compacted %s from %.1f MB to %.1f MB', name, before / 2 ** 20, after / 2 ** 20)
+    return compacted
+
+
+def load_csv(name, compact=True, **read_kwargs) -> pd.DataFrame:
+    """Load a CSV file of the datasets folder through the shared cache.
+
+    Args:
+        name ([str]): File name relative to the datasets folder
+
+        compact ([bool]): Give the columns compact dtypes (see ``cleaning.compact``)
+
+        read_kwargs: Keyword arguments forwarded to ``pd.read_csv``
+    """
+    path = dataset_path(name)
+    # repr() keeps list arguments such as usecols hashable
+    params = (compact,) + tuple((arg, repr(value)) for arg, value in sorted(read_kwargs.items()))
+
+    def build():
+        with section('load'):
+            frame = pd.read_csv(path, **read_kwargs)
+        return _compacted(name, frame) if compact else frame
+
+    return cached(('csv', path), [path], build, params)
+
+
+def invalidate(name=None) -> None:
+    """Drop cached objects so they are rebuilt on next access.
+
+    Args:
+        name: Dataset file name (or cached object identifier) to drop; everything when None
+    """
+    global _cache_bytes
+
+    targets = None if name is None else {name, ('csv', dataset_path(name))}
+
+    with _cache_lock:
+        for key in list(_cache):
+            if targets is None or key[0] in targets:
+                _cache_bytes -= _cache.pop(key)[1]
+
+
+def cache_info() -> dict:
+    """Summary of the cache contents, useful for debugging memory usage."""
+    with _cache_lock:
+        return {
+            'entries': len(_cache),
+            'bytes': _cache_bytes,
+            'max_bytes': MAX_CACHE_BYTES,
+        }
+
+
+def _build_apps() -> pd.DataFrame:
+    return _compacted('apps', cleaning.clean_apps(pd.read_csv(dataset_path('apps.csv'), index_col=0)))
+
+
+def _build_pulls() -> pd.DataFrame:
+    return _compacted('pulls', cleaning.prepare_pulls(
+        pd.read_csv(dataset_path('pulls_2011-2013.csv')),
+        pd.read_csv(dataset_path('pulls_2014-2018.csv'))
+    ))
+
+
+def _build_csv(name, file_name) -> pd.DataFrame:
+    return _compacted(name, pd.read_csv(dataset_path(file_name)))
+
+
+# Cleaned datasets: name -> (raw files it is derived from, function building it from them)
+PREPARED = {
+    'apps': (['apps.csv'], _build_apps),
+    'pulls': (['pulls_2011-2013.csv', 'pulls_2014-2018.csv'], _build_pulls),
+    'pull_files': (['pull_files.csv'], partial(_build_csv, 'pull_files', 'pull_files.csv')),
+    'netflix': (['netflix_data.csv'], partial(_build_csv, 'netflix', 'netflix_data.csv')),
+}
+
+
+def artifact_path(name) -> str:
+    """Path of the precompiled file of a cleaned dataset.
+
+    Args:
+        name ([str]): Key of the dataset in ``PREPARED``
+    """
+    return os.path.abspath(os.path.join(ARTIFACT_DIR, f'{name}.v{cleaning.VERSION}.feather'))
+
+
+def is_fresh(name) -> bool:
+    """Whether the precompiled file of a dataset exists and is newer than its sources.
+
+    Args:
+        name ([str]): Key of the dataset in ``PREPARED``
+    """
+    path = artifact_path(name)
+    if feather is None or not os.path.exists(path):
+        return False
+
+    sources, _ = PREPARED[name]
+    built = os.stat(path).st_mtime_ns
+    return all(os.stat(dataset_path(source)).st_mtime_ns <= built for source in sources)
+
+
+def build_artifact(name) -> str:
+    """Clean a dataset from its raw files and store it as a Feather file.
+
+    Args:
+        name ([str]): Key of the dataset in ``PREPARED``
+    """
+    _, build = PREPARED[name]
+    path = artifact_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    write_frame(build(), path)
+    return path
+
+
+def write_frame(frame, path) -> None:
+    """Store a frame as a Feather file that can be memory-mapped and read without copies.
+
+    Args:
+        frame ([pd.DataFrame]): Frame to store
+
+        path ([str]): Path of the file, replaced atomically
+    """
+    # Write to a temporary file first so readers never see a partial artifact.
+    # Uncompressed files in a single chunk can be memory-mapped and read without copies.
+    table = _to_table(frame)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(table.num_rows, 1))
+    os.replace(tmp_path, path)
+
+
+def read_frame(path) -> pd.DataFrame:
+    """Read a Feather file written by ``write_frame``, memory-mapped.
+
+    Args:
+        path ([str]): Path of the file
+    """
+    # One block per column: the numeric columns without nulls stay views of the
+    # mapped file, whose pages are shared by every process mapping it
+    return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def _to_table(frame):
+    """Arrow table of a frame, with the NaN of float columns kept as values rather than nulls.
+
+    Columns with nulls are copied when converted back to pandas, NaN values are not.
+    """
+    table = pa.Table.from_pandas(frame)
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        if pa.types.is_floating(field.type) and column.null_count:
+            values = pa.array(column.to_numpy(), type=field.type, from_pandas=False)
+            table = table.set_column(i, field, values)
+    return table
+
+
+def load_prepared(name) -> pd.DataFrame:
+    """Load a cleaned dataset, from its precompiled file when it is up to date.
+
+    Args:
+        name ([str]): Key of the dataset in ``PREPARED``
+    """
+    sources, build = PREPARED[name]
+
+    def load():
+        if is_fresh(name):
+            with section('load'):
+                return read_frame(artifact_path(name))
+        with section('clean'):
+            return build()
+
+    return cached(('prepared', name), [dataset_path(source) for source in sources], load)
@@ -0,0 +1,111 @@
+"""
+Density rendering of the scatter, strip and joint plots of large datasets.
+
+Matplotlib draws one marker per point, so the render time and the look of a
+scatter plot degrade with the number of rows. Above DENSITY_THRESHOLD rows the
+plots are drawn from a fixed number of bins instead: hexagonal densities, or
+aggregated points (one marker per occupied cell of a grid and color, larger
+for more points). Their cost then hardly depends on the number of rows. Below
+the threshold the pages draw every point as before.
+"""
+
+# Import necessary libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+# Number of rows above which the plots are drawn as densities
+DENSITY_THRESHOLD = int(os.environ.get('PORTFOLIO_DENSITY_THRESHOLD', '20000'))
+
+# Hexagons along the x axis of the hexagonal densities
+GRIDSIZE = 50
+
+# Cells along each axis of the grid of the aggregated points
+POINT_BINS = 200
+
+# Area (in points^2) of an aggregated point standing for a single row
+POINT_SIZE = 12
+
+
+def is_dense(values) -> bool:
+    """Whether a plot of these rows is drawn as a density.
+
+    Args:
+        values: Any column of the plotted rows
+    """
+    return len(values) > DENSITY_THRESHOLD
+
+
+def _cells(values, bins) -> np.ndarray:
+    """Index of the cell of each value among ``bins`` equal cells spanning their range."""
+    low, high = values.min(), values.max()
+    if high == low:
+        return np.zeros(len(values), dtype='int64')
+    return np.minimum(((values - low) / (high - low) * bins).astype('int64'), bins - 1)
+
+
+def aggregate_points(x, y, color=None, bins=POINT_BINS) -> pd.DataFrame:
+    """One point per occupied cell of a ``bins`` x ``bins`` grid (and color), at the mean of its rows.
+
+    Args:
+        x: Numeric sequence or Series
+
+        y: Numeric sequence or Series
+
+        color: Matplotlib color of each row, or None
+
+        bins ([int]): Cells along each axis
+    """
+    points = pd.DataFrame({
+        'x': np.asarray(x, dtype=float),
+        'y': np.asarray(y, dtype=float),
+        'color': 'C0' if color is None else np.asarray(color, dtype=object),
+    })
+    points = points[np.isfinite(points['x']) & np.isfinite(points['y'])]
+
+    cells = [_cells(points['x'].to_numpy(), bins), _cells(points['y'].to_numpy(), bins), points['color']]
+    return (points.groupby(cells, sort=False)
+                  .agg(x=('x', 'mean'), y=('y', 'mean'), count=('x', 'size'), color=('color', 'first'))
+                  .reset_index(drop=True))
+
+
+def scatter(ax, x, y, color=None, bins=POINT_BINS, **scatter_kwargs):
+    """Scatter plot of the aggregated points, their area growing with the log of their number of rows.
+
+    Args:
+        ax: Matplotlib axes to draw on
+
+        x: Numeric sequence or Series
+
+        y: Numeric sequence or Series
+
+        color: Matplotlib color of each row, or None
+
+        bins ([int]): Cells along each axis of the grid
+
+        scatter_kwargs: Keyword arguments forwarded to ``ax.scatter``
+    """
+    points = aggregate_points(x, y, color, bins)
+    sizes = POINT_SIZE * (1 + np.log2(points['count'].to_numpy()))
+    return ax.scatter(points['x'], points['y'], s=sizes, color=list(points['color']), **scatter_kwargs)
+
+
+def hexbin(ax, x, y, gridsize=GRIDSIZE, **hexbin_kwargs):
+    """Hexagonal density of the rows, with a log color scale.
+
+    Args:
+        ax: Matplotlib axes to draw on
+
+        x: Numeric sequence or Series
+
+        y: Numeric sequence or Series
+
+        gridsize ([int]): Hexagons along the x axis
+
+        hexbin_kwargs: Keyword arguments forwarded to ``ax.hexbin``
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    present = np.isfinite(x) & np.isfinite(y)
+    hexbin_kwargs.setdefault('cmap', 'Blues')
+    return ax.hexbin(x[present], y[present], gridsize=gridsize, bins='log', mincnt=1, **hexbin_kwargs)
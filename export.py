@@ -0,0 +1,334 @@
+"""
+Static export of the portfolio: every page rendered to HTML with its assets.
+
+Usage:
+    python export.py [--out site]
+
+The pages registered in app.py are run once each with the headless recorder
+(see ``headless.py``), and their markdown, tables and figures are written as
+one HTML file per page. Figures, scripts and styles are assets named after a
+hash of their content, so they can be cached forever. Every text file also
+gets a gzip-compressed copy (``.gz``) for the servers and CDNs that serve those
+directly. The widgets show the value a first visitor gets; the live app stays
+the place to interact with the pages.
+"""
+
+# Import necessary libraries
+import argparse
+import gzip
+import hashlib
+import html
+import os
+import re
+import runpy
+import shutil
+import sys
+import tempfile
+import textwrap
+from collections import defaultdict
+
+import pandas as pd
+
+# Pages are rendered as a first visitor sees them, in full and without the background work of the live app
+os.environ.setdefault('PORTFOLIO_WARMUP', '0')
+os.environ.setdefault('PORTFOLIO_ON_DEMAND', '0')
+os.environ.setdefault('PORTFOLIO_REFRESH_SECONDS', '0')
+
+import headless
+
+try:
+    import markdown
+except ImportError:  # pragma: no cover - the export is not available without it
+    markdown = None
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# Label of the sidebar selectbox of MultiPage.run, replaced by links in the export
+PAGE_SELECTOR = 'My Projects'
+
+# Attribute of the link to the page being shown
+CURRENT = ' class="current"'
+
+# Text files, written with a compressed copy (the images are compressed already)
+COMPRESSED = ('.html', '.css', '.js')
+
+STYLE = '''
+body { margin: 0; display: flex; font-family: "Source Sans Pro", sans-serif; color: #262730; line-height: 1.6; }
+nav { flex: 0 0 16rem; min-height: 100vh; padding: 2rem 1.5rem; background: #f0f2f6; box-sizing: border-box; }
+nav ul { padding: 0; list-style: none; }
+nav a { color: inherit; text-decoration: none; }
+nav a.current { font-weight: bold; }
+main { flex: 1; max-width: 46rem; margin: 0 auto; padding: 3rem 1rem; overflow-x: hidden; }
+img { max-width: 100%; }
+.row { display: flex; gap: 2rem; }
+.table { max-height: 25rem; overflow: auto; margin: 1rem 0; }
+table.dataframe { border-collapse: collapse; font-size: 0.85rem; }
+table.dataframe th, table.dataframe td { padding: 0.2rem 0.5rem; border: 1px solid #e6e9ef; }
+.widget { color: #555; }
+'''
+
+TEMPLATE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="{style}">
+{scripts}
+</head>
+<body>
+<nav>
+<h3>{selector}</h3>
+<ul>
+{links}
+</ul>
+{sidebar}
+</nav>
+<main>
+{content}
+</main>
+</body>
+</html>
+'''
+
+
+class Bundle:
+    """Files of the export, written to a folder; the assets are named after their content.
+
+    Args:
+        root ([str]): Folder of the bundle
+    """
+    def __init__(self, root) -> None:
+        self.root = root
+        os.makedirs(os.path.join(root, 'assets'), exist_ok=True)
+        self._plotly_js = None
+
+    def write(self, path, data) -> None:
+        """Write a file of the bundle, with a compressed copy for text files.
+
+        Args:
+            path ([str]): Path relative to the bundle folder
+
+            data ([bytes]): Content of the file
+        """
+        full_path = os.path.join(self.root, path)
+        with open(full_path, 'wb') as file:
+            file.write(data)
+        if path.endswith(COMPRESSED):
+            # No timestamp in the header, so the same content always compresses to the same bytes
+            with open(full_path + '.gz', 'wb') as file:
+                file.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+    def asset(self, data, stem, extension) -> str:
+        """Write an asset once per content and return its path, relative to the pages.
+
+        Args:
+            data ([bytes]): Content of the asset
+
+            stem ([str]): Beginning of its file name, e.g. "figure"
+
+            extension ([str]): Extension of its file name, e.g. ".png"
+        """
+        path = f'assets/{stem}.{hashlib.sha256(data).hexdigest()[:16]}{extension}'
+        if not os.path.exists(os.path.join(self.root, path)):
+            self.write(path, data)
+        return path
+
+    @property
+    def plotly_js(self) -> str:
+        """Path of the plotly.js asset, shared by every chart."""
+        if self._plotly_js is None:
+            from plotly.offline import get_plotlyjs
+            self._plotly_js = self.asset(get_plotlyjs().encode(), 'plotly', '.js')
+        return self._plotly_js
+
+
+def page_file(index, title) -> str:
+    """File name of a page, index.html for the first one."""
+    return 'index.html' if index == 0 else re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-') + '.html'
+
+
+def render_pages(titles=None) -> list:
+    """Run every page of the app with the headless recorder: [(title, elements)].
+
+    Args:
+        titles ([list]): Titles of the pages to run, all by default
+    """
+    recorder = headless.install()
+    # Running app.py registers the pages (and shows the first one)
+    app = runpy.run_path(APP, run_name='__main__')['app']
+
+    pages = []
+    for page in app.pages:
+        if titles and page['title'] not in titles:
+            continue
+        recorder.choices[PAGE_SELECTOR] = page['title']
+        recorder.elements.clear()
+        app.run()
+        pages.append((page['title'], list(recorder.elements)))
+    return pages
+
+
+class PageWriter:
+    """Turns the recorded elements of a page into HTML, writing its assets to the bundle.
+
+    Args:
+        bundle ([Bundle]): Bundle the assets are written to
+
+        elements ([list]): Elements recorded while the page ran
+    """
+    def __init__(self, bundle, elements) -> None:
+        self.bundle = bundle
+        # Elements of each container (main, sidebar, columns, placeholders...) in order
+        self.children = defaultdict(list)
+        for element in elements:
+            self.children[element.container].append(element)
+        self.scripts = set()
+        # Kinds of elements the export has no HTML for
+        self.skipped = set()
+
+    def container(self, name) -> str:
+        """HTML of the elements of a container, columns side by side."""
+        parts, row = [], []
+        for element in self.children[name]:
+            if element.kind == 'column':
+                width, = element.args[1:]
+                row.append(f'<div style="flex: {width}">\n{self.container(element.args[0])}\n</div>')
+                continue
+            if row:
+                parts.append('<div class="row">\n' + '\n'.join(row) + '\n</div>')
+                row = []
+            parts.append(self.element(element))
+        if row:
+            parts.append('<div class="row">\n' + '\n'.join(row) + '\n</div>')
+        return '\n'.join(part for part in parts if part)
+
+    def element(self, element) -> str:
+        """HTML of an element."""
+        kind, args, kwargs = element.kind, element.args, element.kwargs
+        if kind in ('empty', 'container'):
+            return self.container(args[0])
+        if kind == 'expander':
+            return (f'<details{" open" if kwargs.get("expanded") else ""}><summary>{html.escape(args[1])}</summary>\n'
+                    f'{self.container(args[0])}\n</details>')
+        if kind == 'markdown':
+            return self.markdown(args[0])
+        if kind == 'write':
+            return self.write(*args)
+        if kind == 'image':
+            return self.image(args[0])
+        if kind == 'plotly_chart':
+            return self.plotly_chart(args[0])
+        if kind in ('selectbox', 'radio', 'multiselect', 'checkbox', 'slider'):
+            if args[0] == PAGE_SELECTOR:
+                return ''
+            value = ', '.join(map(str, args[1])) if isinstance(args[1], list) else str(args[1])
+            return f'<p class="widget">{html.escape(args[0])}: <strong>{html.escape(value)}</strong></p>'
+        self.skipped.add(kind)
+        return ''
+
+    def markdown(self, text) -> str:
+        # Indented triple-quoted strings, as st.markdown accepts them
+        return markdown.markdown(textwrap.dedent(text).strip(), extensions=['tables'])
+
+    def write(self, *args) -> str:
+        # Consecutive texts and numbers make a paragraph, frames are shown as tables
+        parts, text = [], []
+        for arg in args:
+            if isinstance(arg, (pd.DataFrame, pd.Series)):
+                if text:
+                    parts.append(self.markdown(' '.join(text)))
+                    text = []
+                frame = arg.to_frame() if isinstance(arg, pd.Series) else arg
+                parts.append(f'<div class="table">\n{frame.to_html(classes="dataframe", border=0)}\n</div>')
+            else:
+                text.append(str(arg))
+        if text:
+            parts.append(self.markdown(' '.join(text)))
+        return '\n'.join(parts)
+
+    def image(self, data) -> str:
+        extension = '.png' if data[:8] == b'\x89PNG\r\n\x1a\n' else '.jpg'
+        return f'<img src="{self.bundle.asset(data, "image", extension)}" alt="">'
+
+    def plotly_chart(self, figure) -> str:
+        import plotly.io as pio
+
+        self.scripts.add(self.bundle.plotly_js)
+        return pio.to_html(figure, include_plotlyjs=False, full_html=False, default_width='100%')
+
+
+def export(out, titles=None) -> list:
+    """Write the static bundle of the pages to a folder, replacing a previous export; return its files.
+
+    Args:
+        out ([str]): Folder of the bundle
+
+        titles ([list]): Titles of the pages to export, all by default
+    """
+    if os.path.exists(out) and os.listdir(out) and not os.path.exists(os.path.join(out, 'index.html')):
+        raise FileExistsError(f'{out} is not empty and does not hold a previous export')
+
+    pages = render_pages(titles)
+
+    # Written next to the target and swapped in once complete
+    root = tempfile.mkdtemp(prefix='.export-', dir=os.path.dirname(os.path.abspath(out)))
+    try:
+        # Readable by the file server, unlike the private folders of mkdtemp
+        os.chmod(root, 0o755)
+        bundle = Bundle(root)
+        style = bundle.asset(STYLE.encode(), 'style', '.css')
+        files = [page_file(index, title) for index, (title, _) in enumerate(pages)]
+
+        for (title, elements), file_name in zip(pages, files):
+            writer = PageWriter(bundle, elements)
+            content = writer.container('main')
+            links = '\n'.join(
+                f'<li><a href="{other}"{CURRENT if other == file_name else ""}>{html.escape(other_title)}</a></li>'
+                for (other_title, _), other in zip(pages, files))
+            page = TEMPLATE.format(
+                title=html.escape(title), style=style, selector=PAGE_SELECTOR, links=links,
+                sidebar=writer.container('sidebar'), content=content,
+                scripts='\n'.join(f'<script src="{script}"></script>' for script in sorted(writer.scripts)))
+            bundle.write(file_name, page.encode())
+            for kind in sorted(writer.skipped):
+                print(f'{title}: {kind} elements are not exported', file=sys.stderr)
+
+        if os.path.exists(out):
+            shutil.rmtree(out)
+        os.rename(root, out)
+    except BaseException:
+        shutil.rmtree(root, ignore_errors=True)
+        raise
+
+    return files
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Export the pages of the portfolio to static HTML.')
+    parser.add_argument('--out', default='site', help='folder of the bundle (replaced if it holds an export)')
+    parser.add_argument('--page', action='append', help='title of a page to export (all by default)')
+    args = parser.parse_args(argv)
+
+    if markdown is None:
+        print('Markdown is not installed, nothing to export')
+        return 1
+
+    try:
+        files = export(args.out, args.page)
+    except FileExistsError as error:
+        parser.error(str(error))
+
+    for file_name in files:
+        size = os.path.getsize(os.path.join(args.out, file_name))
+        compressed = os.path.getsize(os.path.join(args.out, file_name + '.gz'))
+        print(f'{file_name}: {size / 1024:.0f} KB ({compressed / 1024:.0f} KB compressed)')
+
+    assets = os.listdir(os.path.join(args.out, 'assets'))
+    total = sum(os.path.getsize(os.path.join(args.out, 'assets', name)) for name in assets if not name.endswith('.gz'))
+    print(f"assets: {sum(not name.endswith('.gz') for name in assets)} files, {total / 2 ** 20:.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Cache of the rendered figures of the pages.
+
+The figures are deterministic functions of their input data, yet Streamlit
+rebuilds and re-rasterizes them on every rerun. Here matplotlib figures are
+rendered once to PNG bytes and Plotly figures built once, keyed by a hash of
+the input data and the plot arguments, and served from a process-wide LRU.
+
+Within a ``progressive()`` block (or a function decorated with it), the
+matplotlib figures missing from the cache only get a placeholder, so the text
+and tables of the page are shown first. The figures are then rendered at the
+end of the block, or concurrently in worker processes (each with its own pyplot
+and the Agg backend) while the page goes on, filling their places as they complete.
+"""
+
+# Import necessary libraries
+import contextlib
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import partial
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from profiling import section
+
+# Number of rendered figures kept in memory
+MAX_FIGURES = int(os.environ.get('PORTFOLIO_FIGURE_CACHE_SIZE', '64'))
+
+# Resolution of the rendered PNGs, the same as st.pyplot uses
+DPI = 200
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+
+# pyplot keeps global state (current figure), so only one thread draws with it at a time
+_pyplot_lock = threading.Lock()
+
+# Processes rendering the figures of progressive() blocks; 1 renders them in the page's thread
+RENDER_WORKERS = int(os.environ.get('PORTFOLIO_RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Figures deferred by the progressive() block running in this thread
+_pending = threading.local()
+
+
+def fingerprint(*objects) -> str:
+    """Hash identifying the content of frames, arrays and plain values.
+
+    Args:
+        objects: Values to hash; lists, tuples and dicts are hashed recursively
+    """
+    digest = hashlib.sha1()
+
+    def update(obj):
+        if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+            digest.update(repr(obj.columns if isinstance(obj, pd.DataFrame) else obj.name).encode())
+            digest.update(pd.util.hash_pandas_object(obj).values.tobytes())
+        elif isinstance(obj, np.ndarray):
+            digest.update(repr((obj.dtype, obj.shape)).encode())
+            digest.update(pd.util.hash_array(obj.ravel()).tobytes() if obj.dtype == object else obj.tobytes())
+        elif isinstance(obj, (list, tuple)):
+            digest.update(b'[')
+            for item in obj:
+                update(item)
+            digest.update(b']')
+        elif isinstance(obj, dict):
+            update(sorted(obj.items(), key=repr))
+        else:
+            digest.update(repr(obj).encode())
+
+    for obj in objects:
+        update(obj)
+    return digest.hexdigest()
+
+
+def to_png(figure) -> bytes:
+    """Rasterize a figure to PNG bytes and close it so pyplot doesn't keep it alive.
+
+    Args:
+        figure: matplotlib Figure, Axes or seaborn grid
+    """
+    if not isinstance(figure, Figure):
+        figure = figure.figure
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', bbox_inches='tight', dpi=DPI)
+    plt.close(figure)
+    return buffer.getvalue()
+
+
+def _key(kind, draw, data, params) -> tuple:
+    return (kind, draw.__module__, draw.__qualname__, fingerprint(data, params))
+
+
+def _lookup(key):
+    with _lock:
+        if key in _figures:
+            _figures.move_to_end(key)
+            return _figures[key]
+    return None
+
+
+def _remember(key, value) -> None:
+    with _lock:
+        _figures[key] = value
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+
+
+def cached_render(kind, draw, data, params, render, lock=None):
+    """Look a figure up in the cache, rendering it on a miss.
+
+    Args:
+        kind ([str]): Kind of rendering, part of the key
+
+        draw: Function drawing the figure from ``data`` and ``params``
+
+        data ([tuple]): Positional arguments of ``draw``, hashed by content
+
+        params ([dict]): Keyword arguments of ``draw``
+
+        render: Function turning the result of ``draw`` into the cached value
+
+        lock: Lock held while drawing and rendering
+    """
+    key = _key(kind, draw, data, params)
+    value = _lookup(key)
+    if value is None:
+        value = _render(key, draw, data, params, render, lock)
+    return value
+
+
+def _render(key, draw, data, params, render, lock=None):
+    with lock or contextlib.nullcontext():
+        with section('plot'):
+            figure = draw(*data, **params)
+        with section('serialize'):
+            value = render(figure)
+
+    _remember(key, value)
+    return value
+
+
+def _init_worker() -> None:
+    matplotlib.use('Agg')
+
+
+def _render_png(draw, data, params) -> bytes:
+    """Draw and rasterize a figure in a worker process."""
+    return to_png(draw(*data, **params))
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking the threads of the server is unsafe, the workers start afresh
+            _pool = ProcessPoolExecutor(RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker)
+        return _pool
+
+
+@contextlib.contextmanager
+def progressive():
+    """Show the rest of a block before rendering the matplotlib figures shown in it by ``pyplot``.
+
+    Each figure missing from the cache gets a placeholder in the page. With
+    render workers, the figure is drawn in a worker process while the block
+    goes on, and its placeholder is filled as soon as it is done; otherwise the
+    figures are drawn at the end of the block, in document order. The draw
+    functions must then be defined at module level and their arguments
+    picklable. Also usable as a decorator of a page function.
+    """
+    if getattr(_pending, 'figures', None) is not None:
+        # Already inside a progressive block
+        yield
+        return
+
+    figures = _pending.figures = []
+    try:
+        yield
+    except BaseException:
+        for key, placeholder, job in figures:
+            if isinstance(job, Future):
+                job.cancel()
+        raise
+    finally:
+        _pending.figures = None
+
+    submitted = {}
+    for key, placeholder, job in figures:
+        if isinstance(job, Future):
+            submitted[job] = (key, placeholder)
+            continue
+        png = job()
+        with section('serialize'):
+            placeholder.image(png, use_column_width=True)
+
+    pending = set(submitted)
+    while pending:
+        # Time spent waiting for the workers, once the rest of the block is shown
+        with section('plot'):
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            key, placeholder = submitted[future]
+            png = future.result()
+            _remember(key, png)
+            with section('serialize'):
+                placeholder.image(png, use_column_width=True)
+
+
+def pyplot(draw, *data, **params) -> None:
+    """Show a matplotlib figure through the cache, in place of ``st.pyplot``.
+
+    Args:
+        draw: Function returning a Figure (or Axes / seaborn grid). Everything the
+            figure depends on must come from its arguments, since only they are hashed.
+
+        data: Positional arguments of ``draw``
+
+        params: Keyword arguments of ``draw``
+    """
+    figures = getattr(_pending, 'figures', None)
+    if figures is not None:
+        key = _key('png', draw, data, params)
+        png = _lookup(key)
+        if png is None:
+            if RENDER_WORKERS > 1:
+                job = _render_pool().submit(_render_png, draw, data, params)
+            else:
+                job = partial(_render, key, draw, data, params, to_png, _pyplot_lock)
+            # Shown by the progressive() block once the rest of it is
+            figures.append((key, st.empty(), job))
+            return
+    else:
+        png = cached_render('png', draw, data, params, to_png, _pyplot_lock)
+
+    with section('serialize'):
+        st.image(png, use_column_width=True)
+
+
+def plotly_chart(build, *data, **params) -> None:
+    """Show a Plotly figure through the cache, in place of ``st.plotly_chart``.
+
+    Args:
+        build: Function returning a Plotly figure from its arguments
+
+        data: Positional arguments of ``build``
+
+        params: Keyword arguments of ``build``
+    """
+    figure = cached_render('plotly', build, data, params, lambda figure: figure)
+    # Streamlit serializes the figure to JSON here
+    with section('serialize'):
+        st.plotly_chart(figure, use_container_width=True)
+
+
+def clear() -> None:
+    """Drop every cached figure."""
+    with _lock:
+        _figures.clear()
@@ -0,0 +1,147 @@
+"""
+Headless stand-in for the streamlit module.
+
+Lets the app and its pages run without a Streamlit server or a browser, e.g. to
+benchmark them. Every element the script emits is recorded instead of being
+sent to a browser, and widgets return their default value unless a choice was
+given for their label.
+
+Usage:
+    recorder = headless.install(choices={'My Projects': 'Profile'})
+    runpy.run_path('app.py', run_name='__main__')
+    recorder.elements  # [Element('markdown', 'main', ('# Laurence Marcano ...',), {}), ...]
+
+``install`` must run before the modules importing streamlit are imported.
+"""
+
+# Import necessary libraries
+import sys
+from collections import namedtuple
+
+# One emitted element: Streamlit function name, container it was emitted in, and its arguments
+Element = namedtuple('Element', ['kind', 'container', 'args', 'kwargs'])
+
+
+class _Container:
+    """Sidebar, column, expander or placeholder: records its elements under its own name."""
+    def __init__(self, recorder, name) -> None:
+        self._recorder = recorder
+        self._name = name
+
+    def __enter__(self):
+        self._recorder._containers.append(self._name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._recorder._containers.pop()
+        return False
+
+    def __getattr__(self, kind):
+        def emit(*args, **kwargs):
+            self._recorder._containers.append(self._name)
+            try:
+                return getattr(self._recorder, kind)(*args, **kwargs)
+            finally:
+                self._recorder._containers.pop()
+        return emit
+
+
+class Recorder:
+    """Object installed as the streamlit module, recording what the script emits.
+
+    Args:
+        choices ([dict]): Widget label -> value to return instead of the widget's default
+    """
+    def __init__(self, choices=None) -> None:
+        self.choices = dict(choices or {})
+        self.elements = []
+        # Options offered by each selection widget, by label
+        self.options = {}
+        self._containers = ['main']
+        self._count = 0
+        self.sidebar = _Container(self, 'sidebar')
+
+    def _emit(self, kind, *args, **kwargs) -> None:
+        self.elements.append(Element(kind, self._containers[-1], args, kwargs))
+
+    def _new_container(self, kind, *args, **kwargs) -> _Container:
+        self._count += 1
+        name = f'{kind}-{self._count}'
+        self._emit(kind, name, *args, **kwargs)
+        return _Container(self, name)
+
+    def __getattr__(self, kind):
+        # Any other element (markdown, write, image, pyplot, plotly_chart, ...)
+        if kind.startswith('__'):
+            raise AttributeError(kind)
+
+        def emit(*args, **kwargs):
+            self._emit(kind, *args, **kwargs)
+        return emit
+
+    def columns(self, spec, **kwargs) -> list:
+        # Each column is recorded with its relative width
+        widths = [1] * spec if isinstance(spec, int) else list(spec)
+        return [self._new_container('column', width) for width in widths]
+
+    def empty(self) -> _Container:
+        return self._new_container('empty')
+
+    def container(self) -> _Container:
+        return self._new_container('container')
+
+    def expander(self, label, expanded=False) -> _Container:
+        return self._new_container('expander', label)
+
+    def _choose(self, label, default, options=None, format_func=str):
+        if options is not None:
+            self.options[label] = [format_func(option) for option in options]
+        if label not in self.choices:
+            return default
+
+        choice = self.choices[label]
+        for option in options or []:
+            if option == choice or format_func(option) == choice:
+                return option
+        return choice
+
+    def selectbox(self, label, options, index=0, format_func=str, **kwargs):
+        options = list(options)
+        value = self._choose(label, options[index] if options else None, options, format_func)
+        self._emit('selectbox', label, value)
+        return value
+
+    def radio(self, label, options, index=0, format_func=str, **kwargs):
+        return self.selectbox(label, options, index, format_func)
+
+    def multiselect(self, label, options, default=None, format_func=str, **kwargs):
+        value = list(self._choose(label, list(default or []), list(options), format_func))
+        self._emit('multiselect', label, value)
+        return value
+
+    def checkbox(self, label, value=False, **kwargs):
+        value = self._choose(label, value)
+        self._emit('checkbox', label, value)
+        return value
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        value = self._choose(label, min_value if value is None else value)
+        self._emit('slider', label, value)
+        return value
+
+    def button(self, label, **kwargs):
+        return self._choose(label, False)
+
+    def text_input(self, label, value='', **kwargs):
+        return self._choose(label, value)
+
+
+def install(choices=None) -> Recorder:
+    """Install a new recorder as the streamlit module and return it.
+
+    Args:
+        choices ([dict]): Widget label -> value to return instead of the widget's default
+    """
+    recorder = Recorder(choices)
+    sys.modules['streamlit'] = recorder
+    return recorder
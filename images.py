@@ -0,0 +1,107 @@
+"""
+Pre-resized renditions of the images shown by the pages.
+
+Handing a decoded array to ``st.image`` makes Streamlit re-encode the full
+resolution pixels on every rerun. Here an image is decoded and downsampled
+once per process to twice its display width, sharp on HiDPI screens, and the
+encoded bytes are kept in the data cache until the source file changes.
+Streamlit serves a single image to every screen (there is no srcset), so only
+that rendition is built.
+
+The same bytes are passed to Streamlit on every rerun, so its media file (named
+after a hash of the content) keeps the same URL and stays cached by browsers.
+"""
+
+# Import necessary libraries
+import io
+
+from PIL import Image
+import streamlit as st
+
+from data_loader import cached, dataset_path
+from profiling import section
+
+# JPEG quality of the renditions
+QUALITY = 85
+
+# Pixels of the rendition per CSS pixel of the display width
+DENSITY = 2
+
+
+class Rendition:
+    """Encoded image resized to one width.
+
+    Args:
+        data ([bytes]): Encoded image
+
+        width ([int]): Width in pixels
+
+        height ([int]): Height in pixels
+
+        mimetype ([str]): Type of the encoded image, e.g. "image/jpeg"
+    """
+    def __init__(self, data, width, height, mimetype) -> None:
+        self.data = data
+        self.width = width
+        self.height = height
+        self.mimetype = mimetype
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+
+def _encode(image) -> tuple:
+    buffer = io.BytesIO()
+    if 'A' in image.getbands():
+        image.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue(), 'image/png'
+    image.convert('RGB').save(buffer, format='JPEG', quality=QUALITY, optimize=True)
+    return buffer.getvalue(), 'image/jpeg'
+
+
+def load_image(name, width, density=DENSITY) -> Rendition:
+    """Rendition of an image of the datasets folder, ``width`` pixels wide at a pixel density.
+
+    Images are never upscaled: a rendition wider than the source gets the source size.
+
+    Args:
+        name ([str]): File name relative to the datasets folder
+
+        width ([int]): Display width in CSS pixels
+
+        density ([int]): Pixels per CSS pixel
+    """
+    path = dataset_path(name)
+
+    def build():
+        with section('load'), Image.open(path) as source:
+            target = min(width * density, source.width)
+            size = (target, max(1, round(source.height * target / source.width)))
+            # JPEG sources are decoded directly at a reduced scale when it is still large enough
+            source.draft(source.mode, size)
+            source.load()
+
+            resized = source if source.size == size else source.resize(size, Image.LANCZOS)
+            data, mimetype = _encode(resized)
+            return Rendition(data, *size, mimetype)
+
+    return cached('image', [path], build, (width, density))
+
+
+def image(name, width, container=st) -> Rendition:
+    """Show the rendition of an image, as wide as its column, and return it.
+
+    The encoded bytes are passed through by Streamlit as they are.
+
+    Args:
+        name ([str]): File name relative to the datasets folder
+
+        width ([int]): Display width in CSS pixels
+
+        container: Streamlit container to show the image in
+    """
+    rendition = load_image(name, width)
+    with section('serialize'):
+        container.image(rendition.data, use_column_width=True)
+    return rendition
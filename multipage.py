@@ -4,8 +4,68 @@ through an object oriented framework.
 """
 
 # Import necessary libraries 
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import streamlit as st
 
+import data_loader
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# Reference point (first import of the framework) to measure the cold start of the server.
+# Run with PYTHONPROFILEIMPORTTIME=1 for a per-module breakdown of the imports.
+PROCESS_START = time.perf_counter()
+
+# Seconds spent loading each lazily imported page, shared by every session
+load_times = {}
+
+# Background warm-up of the pages at server start, disabled with PORTFOLIO_WARMUP=0
+WARMUP = os.environ.get('PORTFOLIO_WARMUP', '1') not in ('', '0')
+WARMUP_WORKERS = int(os.environ.get('PORTFOLIO_WARMUP_WORKERS', '2'))
+WARMUP_THREAD_PREFIX = 'portfolio-warmup'
+
+# Warm-up of each page (by title), shared by every session
+warmups = {}
+_warmup_lock = threading.Lock()
+
+
+class _WarmupThreadFilter(logging.Filter):
+    """Drop the warnings of Streamlit about the warm-up threads running outside of a session."""
+    def filter(self, record):
+        return not record.threadName.startswith(WARMUP_THREAD_PREFIX)
+
+
+# Loggers of the "missing context" warnings, depending on the Streamlit version
+for _name in ['streamlit.report_thread', 'streamlit.script_run_context',
+              'streamlit.runtime.scriptrunner.script_run_context',
+              'streamlit.runtime.scriptrunner_utils.script_run_context']:
+    logging.getLogger(_name).addFilter(_WarmupThreadFilter())
+
+
+# Expensive sections marked with on_demand() are only computed when asked for
+ON_DEMAND = os.environ.get('PORTFOLIO_ON_DEMAND', '1') not in ('', '0')
+
+
+def on_demand(label) -> bool:
+    """Whether to compute an expensive section at the bottom of a page.
+
+    The visitor asks for the section with a checkbox, so the rest of the page
+    never waits for it. Warm-up renders compute it, to fill its caches.
+
+    Args:
+        label ([str]): Label of the checkbox
+    """
+    if not ON_DEMAND or threading.current_thread().name.startswith(WARMUP_THREAD_PREFIX):
+        return True
+    return st.checkbox(label)
+
+
 # Define the multipage class to manage the multiple apps in our program
 class MultiPage:
     """Framework for combining multiple streamlit applications."""
@@ -13,22 +73,105 @@ class MultiPage:
         """Constructor class to generate a list which will store all our applications as an instance variable."""
         self.pages = []
     
-    def add_page(self, title, func) -> None: 
+    def add_page(self, title, func, lazy=False) -> None: 
         """Class Method to Add pages to the project
 
         Args:
             title ([str]): The title of page which we are adding to the list of apps 
             
-            func: Python function to render this page in Streamlit
+            func: Python function to render this page in Streamlit, or the path of the
+                module defining it ("pages.home" uses its ``app`` function, "pages.home:main"
+                any other one). Modules given by path are only imported the first time the
+                page is selected.
+
+            lazy ([bool]): Treat ``func`` as a factory returning the render function, called
+                the first time the page is selected
         """
 
         self.pages.append(
             {
                 "title": title, 
-                "function": func
+                "function": func if callable(func) and not lazy else None,
+                "loader": func if isinstance(func, str) or lazy else None
             }
         )
 
+    def load(self, page):
+        """Resolve the render function of a page, importing its module if needed.
+
+        Args:
+            page ([dict]): One of the entries of ``self.pages``
+        """
+        if page['function'] is None:
+            start = time.perf_counter()
+            loader = page['loader']
+
+            if isinstance(loader, str):
+                module_name, _, func_name = loader.partition(':')
+                module = importlib.import_module(module_name)
+                page['function'] = getattr(module, func_name or 'app')
+            else:
+                page['function'] = loader()
+
+            # Only the first load in the process pays for the imports
+            elapsed = time.perf_counter() - start
+            if page['title'] not in load_times:
+                load_times[page['title']] = elapsed
+                logger.info('Loaded page %r in %.1f ms (%.2f s after process start)',
+                            page['title'], elapsed * 1000, time.perf_counter() - PROCESS_START)
+
+        return page['function']
+
+    def startup_report(self) -> dict:
+        """Seconds since the process started and spent loading each page so far, and the warm-up state."""
+        with _warmup_lock:
+            warm = {title: 'skipped' if future.cancelled() else 'ready' if future.done()
+                           else 'running' if future.running() else 'pending'
+                    for title, future in warmups.items()}
+        return {
+            'uptime': time.perf_counter() - PROCESS_START,
+            'pages': dict(load_times),
+            'warm-up': warm
+        }
+
+    def warm_up(self, max_workers=WARMUP_WORKERS) -> None:
+        """Class Method to fill the caches of every page in background threads, once per process.
+
+        Each page is rendered once outside of any session: Streamlit drops its
+        elements and its widgets return their default value, while the data and
+        figure caches are filled as for a visitor. A page module can define a
+        ``warmup()`` function to be called instead of its render function.
+
+        Args:
+            max_workers ([int]): Number of pages warmed up at the same time
+        """
+        if not WARMUP:
+            return
+
+        with _warmup_lock:
+            pending = [page for page in self.pages if page['title'] not in warmups]
+            if not pending:
+                return
+
+            executor = ThreadPoolExecutor(max_workers, thread_name_prefix=WARMUP_THREAD_PREFIX)
+            for page in pending:
+                warmups[page['title']] = executor.submit(self._warm_up_page, page)
+            # The threads exit once the queued pages are done
+            executor.shutdown(wait=False)
+
+    def _warm_up_page(self, page) -> None:
+        start = time.perf_counter()
+        try:
+            with data_loader.pinned(), profiling.profile_page(f"{page['title']} (warm-up)"):
+                with profiling.section('import'):
+                    func = self.load(page)
+                warmup = getattr(importlib.import_module(func.__module__), 'warmup', None)
+                (warmup or func)()
+        except Exception:
+            logger.exception('Warm-up of page %r failed', page['title'])
+        else:
+            logger.info('Warmed up page %r in %.2f s', page['title'], time.perf_counter() - start)
+
     def run(self):
         # Drodown to select the page to run  
         
@@ -38,5 +181,19 @@ class MultiPage:
             format_func=lambda page: page['title']
         )
 
-        # run the app function 
-        page['function']()
\ No newline at end of file
+        # run the app function, timing the render and its sections, on one version of the datasets
+        with data_loader.pinned(), profiling.profile_page(page['title']) as profile:
+            # A page being warmed up is served from the caches it fills once done,
+            # a page still queued for its warm-up is rendered right away instead
+            warmup = warmups.get(page['title'])
+            if warmup is not None and not warmup.cancel():
+                with profiling.section('warm-up'):
+                    wait([warmup])
+            with profiling.section('import'):
+                func = self.load(page)
+            func()
+
+        if profiling.DEBUG:
+            profiling.debug_panel(profile)
+            st.sidebar.markdown('#### Start-up')
+            st.sidebar.write(self.startup_report())
\ No newline at end of file
@@ -6,7 +6,15 @@ import plotly.express as px
 import seaborn as sns
 import warnings
 import matplotlib.pyplot as plt
-
+import density
+import figure_cache
+import summaries
+from app_index import load_app_index
+from chunked import RATING_EDGES, summarize_sentiment
+from multipage import on_demand
+
+# The text of the page is shown first, its matplotlib figures fill their places once rendered
+@figure_cache.progressive()
 def app():
     st.markdown('''
         # Google Play Store apps and reviews
@@ -17,37 +25,18 @@ def app():
     ''')
 
 
-    # Load app.csv
-    apps_with_duplicates = pd.read_csv('./pages/datasets/apps.csv', index_col=0)
-    # Load user_reviews.csv
-    reviews_df = pd.read_csv('./pages/datasets/user_reviews.csv')
-
-    # Drop duplicates from apps_with_duplicates
-    apps = apps_with_duplicates.drop_duplicates(subset="App")
+    # Bitmap indexes of app.csv, without duplicates and with numeric Installs and Price (see cleaning.clean_apps)
+    index = load_app_index()
 
-    # List of characters to remove
-    chars_to_remove = ["+", "$", ","]
-    # List of column names to clean
-    cols_to_clean = ["Installs", "Price", "Content Rating"]
+    # Apps matching the filters of the sidebar; the charts below are drawn from this view
+    selection = app_filters(index)
+    apps = index.view(selection)
 
-    # Loop for each column in cols_to_clean
-    for col in cols_to_clean:
-        # Loop for each char in chars_to_remove
-        for char in chars_to_remove:
-            # Replace the character with an empty string
-            apps[col] = apps[col].apply(lambda x: x.replace(char,''))
-            
     st.markdown('### The total number of apps and head of dataset')
-    st.write('Total number of apps in the dataset = ', apps["App"].value_counts().sum())
+    st.write('Total number of apps in the dataset = ', index.count(selection))
     # Have a look at 10 head's row
     st.write(apps.head(n=10))
 
-    # Convert Installs to float data type
-    apps["Installs"] = apps["Installs"].astype(float)
-
-    # Convert Price to float data type
-    apps["Price"] = apps["Price"].astype(float)
-
     st.markdown('''
     ## Exploring app categories
     With more than 1 billion active users in 190 countries around the world, Google Play continues to be an important distribution platform to build a global audience. For businesses to get their apps in front of users, it's important to make them more quickly and easily discoverable on Google Play. To improve the overall search experience, Google has introduced the concept of grouping apps into categories.
@@ -60,26 +49,17 @@ def app():
     ''')
 
     # Print the total number of unique categories
-    num_categories = len(apps['Category'].unique())
+    num_categories = len(index.category_counts(selection))
     print('Number of categories = ', num_categories)
 
-    # Count the number of apps in each 'Category'. 
-    num_apps_in_category = apps.groupby('Category')['Category'].count()
+    # Count the number of apps in each 'Category', from the category bitmaps
+    num_apps_in_category = index.category_counts(selection)
 
     # Sort num_apps_in_category in descending order based on the count of apps in each category
     sorted_num_apps_in_category = num_apps_in_category.sort_values(ascending=False)
     print(sorted_num_apps_in_category.head())
 
-    fig_1 = go.Figure(data=[go.Bar(
-            x = num_apps_in_category.index,
-            y = num_apps_in_category.values)])
-
-    fig_1.update_layout(
-        xaxis_title="Category",
-        yaxis_title="N° of App",
-    )
-
-    st.plotly_chart(fig_1, use_container_width=True)
+    figure_cache.plotly_chart(category_chart, num_apps_in_category)
 
     st.markdown('''
         ## Distribution of app ratings
@@ -92,15 +72,9 @@ def app():
     avg_app_rating = apps['Rating'].mean()
     st.write('Average app rating = ', avg_app_rating)
 
-    # Distribution of apps according to their ratings
-    fig_2 = go.Figure(data=[go.Histogram(x=apps['Rating'])])
-
-    fig_2.update_layout(
-        xaxis_title="Rating",
-        yaxis_title="N° of App per Rating",
-    )
-
-    st.plotly_chart(fig_2, use_container_width=True)
+    # Distribution of apps according to their ratings, binned on the server so the chart only carries the counts
+    rating_counts = summaries.histogram(apps['Rating'], RATING_EDGES)
+    figure_cache.plotly_chart(rating_bins_chart, RATING_EDGES, rating_counts)
 
     st.markdown('''
     ## Size and price of an app
@@ -117,27 +91,24 @@ def app():
     ''')
 
 
-    sns.set_style("darkgrid")
     warnings.filterwarnings("ignore")
 
     # Select rows where both 'Rating' and 'Size' values are present (ie. the two values are not null)
-    apps_with_size_and_rating_present = apps[apps['Rating'].notnull() & apps['Size'].notnull()]
-    #print(apps_with_size_and_rating_present.sample(n=5))
+    apps_with_size_and_rating_present = selection & index.present('Rating') & index.present('Size')
 
     # Subset for categories with at least 250 apps
-    large_categories = apps_with_size_and_rating_present.groupby('Category').filter(lambda x: len(x) >= 250)
+    counts = index.category_counts(apps_with_size_and_rating_present)
+    large_categories = index.view(apps_with_size_and_rating_present & index.category(*counts.index[counts >= 250]))
     #print(large_categories.head())
 
     # Plot size vs. rating
-    fig_3 = sns.jointplot(x = large_categories['Size'], y = large_categories['Rating'])
-    st.pyplot(fig_3, use_container_width=True)
+    figure_cache.pyplot(plot_jointplot, large_categories['Size'], large_categories['Rating'])
 
     # Select apps whose 'Type' is 'Paid'
-    paid_apps = apps[apps['Type'] == 'Paid']
+    paid_apps = index.view(selection & index.type('Paid'))
 
     # Plot price vs. rating
-    fig_4 = sns.jointplot(x = paid_apps['Price'], y = paid_apps['Rating']) 
-    st.pyplot(fig_4, use_container_width=True)
+    figure_cache.pyplot(plot_jointplot, paid_apps['Price'], paid_apps['Rating'])
 
     st.markdown('''
     ## Relation between app category and app price
@@ -148,22 +119,18 @@ def app():
     Different categories demand different price ranges. Some apps that are simple and used daily, like the calculator app, should probably be kept free. However, it would make sense to charge for a highly-specialized medical app that diagnoses diabetic patients. Below, we see that **Medical and Family** apps are the most expensive. Some medical apps extend even up to \$80! All game apps are reasonably priced below $20.
     ''')
 
-    fig_5, ax = plt.subplots()
-    fig_5.set_size_inches(15, 8)
-
     # Select a few popular app categories
-    popular_app_cats = apps[apps.Category.isin(['GAME', 'FAMILY', 'PHOTOGRAPHY',
-                                                'MEDICAL', 'TOOLS', 'FINANCE',
-                                                'LIFESTYLE','BUSINESS'])]
+    popular_app_cats = index.view(selection & index.category('GAME', 'FAMILY', 'PHOTOGRAPHY',
+                                                             'MEDICAL', 'TOOLS', 'FINANCE',
+                                                             'LIFESTYLE','BUSINESS'))
 
     # Examine the price trend by plotting Price vs Category
-    ax = sns.stripplot(x = popular_app_cats['Price'], y = popular_app_cats['Category'], jitter=True, linewidth=1)
-    ax.set_title('App pricing trend across categories')
-    st.pyplot(fig_5, use_container_width=True)
+    figure_cache.pyplot(plot_price_trend, popular_app_cats['Price'], popular_app_cats['Category'],
+                        title='App pricing trend across categories')
 
 
     st.markdown('### Apps whose Price is greater than 200')
-    apps_above_200 = apps[apps['Price'] > 200]
+    apps_above_200 = index.view(selection & index.range('Price', low = 200, inclusive = False))
     apps_above_200[['Category', 'App', 'Price']]
     st.write(apps_above_200[['Category', 'App', 'Price']])
 
@@ -176,15 +143,11 @@ def app():
     ''')
 
     # Select apps priced below $100
-    apps_under_100 = apps[apps['Price'] < 100]
-
-    fig_6, ax = plt.subplots()
-    fig_6.set_size_inches(15, 8)
+    apps_under_100 = index.view(selection & index.range('Price', high = 100, inclusive = False))
 
     # Examine price vs category with the authentic apps (apps_under_100)
-    ax = sns.stripplot(x = apps_under_100['Price'], y = apps_under_100['Category'], data =apps_under_100, jitter = True, linewidth = 1)
-    ax.set_title('App pricing trend across categories after filtering for junk apps')
-    st.pyplot(fig_6, use_container_width=True)
+    figure_cache.pyplot(plot_price_trend, apps_under_100['Price'], apps_under_100['Category'],
+                        title='App pricing trend across categories after filtering for junk apps')
 
     st.markdown('''
     ## Popularity of paid apps vs free apps
@@ -203,28 +166,7 @@ def app():
     Are paid apps installed as much as free apps? It turns out that paid apps have a relatively lower number of installs than free apps, though the difference is not as stark as I would have expected!
     ''')
 
-    trace0 = go.Box(
-        # Data for paid apps
-        y = apps[apps['Type'] == 'Paid']['Installs'],
-        name = 'Paid'
-    )
-
-    trace1 = go.Box(
-        # Data for free apps
-        y = apps[apps['Type'] == 'Free']['Installs'],
-        name = 'Free'
-    )
-
-    layout = go.Layout(
-        title = "Number of downloads of paid apps vs. free apps",
-        yaxis = dict(title = "Log number of downloads",
-                    type = 'log',
-                    autorange = True)
-    )
-
-    # Add trace0 and trace1 to a list for plotting
-    fig_6 = [trace0, trace1]
-    st.plotly_chart({'data': fig_6, 'layout': layout}, use_container_width=True)
+    figure_cache.plotly_chart(installs_chart, paid_apps['Installs'], index.view(selection & index.type('Free'))['Installs'])
 
     st.markdown('''
     ## Sentiment analysis of user reviews
@@ -236,17 +178,131 @@ def app():
     In this work, we analyzed over ten thousand apps from the Google Play Store. We can use our findings to inform our decisions should we ever wish to create an app ourselves.
     ''')
 
-    # Join the two dataframes
-    merged_df = apps.merge(reviews_df, on='App')
+    # Reading the reviews is the slowest part of the page, only done when asked for
+    if not on_demand('Show the sentiment polarity of the user reviews'):
+        return
 
-    # Drop NA values from Sentiment and Review columns
-    merged_df = merged_df.dropna(subset = ['Sentiment', 'Review'])
+    # Polarity sketches of the reviews of each app, merged per app Type (see chunked.ReviewSketches)
+    app_types = apps.set_index('App')['Type']
+    polarity = summarize_sentiment(app_types)
+    if polarity is None:
+        st.write('The user reviews (user_reviews.csv) are not in the datasets folder.')
+        return
 
-    sns.set_style('ticks')
-    fig_7, ax = plt.subplots()
-    fig_7.set_size_inches(11, 8)
+    stats = polarity.box_stats()
+    if not stats:
+        st.write('None of the selected apps has user reviews.')
+        return
 
     # User review sentiment polarity for paid vs. free apps
-    ax = sns.boxplot(x = merged_df['Type'] , y = merged_df['Sentiment_Polarity'], data = merged_df)
-    ax.set_title('Sentiment Polarity Distribution')
-    st.pyplot(fig_7)
\ No newline at end of file
+    figure_cache.pyplot(plot_sentiment_box_stats, stats)
+
+
+def app_filters(index):
+    """Selection of the apps matching the filters of the sidebar."""
+    st.sidebar.markdown('### Filter the apps')
+    categories = st.sidebar.multiselect('Categories (all when empty)', index.categories)
+    app_type = st.sidebar.radio('Type', ['All'] + index.types)
+    lowest_price, highest_price = index.bounds('Price')
+    price = st.sidebar.slider('Price ($)', lowest_price, highest_price, (lowest_price, highest_price))
+    lowest_rating, highest_rating = index.bounds('Rating')
+    rating = st.sidebar.slider('Rating', lowest_rating, highest_rating, (lowest_rating, highest_rating), step = 0.1)
+
+    # The full ranges don't filter, so the apps without a rating are kept
+    price = None if tuple(price) == (lowest_price, highest_price) else price
+    rating = None if tuple(rating) == (lowest_rating, highest_rating) else rating
+    types = [] if app_type == 'All' else [app_type]
+
+    return index.select(categories, types, price, rating)
+
+
+# Figures of the page, rendered through figure_cache from the data passed as arguments
+
+def category_chart(num_apps_in_category):
+    fig_1 = go.Figure(data=[go.Bar(
+            x = num_apps_in_category.index,
+            y = num_apps_in_category.values)])
+
+    fig_1.update_layout(
+        xaxis_title="Category",
+        yaxis_title="N° of App",
+    )
+    return fig_1
+
+
+def rating_bins_chart(edges, counts):
+    fig_2 = go.Figure(data=[go.Bar(
+            x = (edges[:-1] + edges[1:]) / 2,
+            y = counts,
+            width = edges[1] - edges[0])])
+
+    fig_2.update_layout(
+        xaxis_title="Rating",
+        yaxis_title="N° of App per Rating",
+    )
+    return fig_2
+
+
+def plot_jointplot(x, y):
+    with sns.axes_style("darkgrid"):
+        if density.is_dense(x):
+            # Hexagonal density instead of a marker per app, the margins are histograms either way
+            return sns.jointplot(x = x, y = y, kind = 'hex',
+                                 joint_kws = dict(gridsize = density.GRIDSIZE, bins = 'log', mincnt = 1))
+        return sns.jointplot(x = x, y = y)
+
+
+def plot_price_trend(price, category, title):
+    # Rows of the categories present, in order of appearance, even for a categorical column
+    category = category.astype(object)
+    with sns.axes_style("darkgrid"):
+        fig, ax = plt.subplots()
+        fig.set_size_inches(15, 8)
+
+        if density.is_dense(price):
+            # One marker per group of close prices of a category, larger for more apps
+            rows, names = pd.factorize(category)
+            palette = np.array(sns.color_palette(n_colors = len(names)).as_hex())
+            present = rows >= 0
+            density.scatter(ax, price[present], rows[present], color = palette[rows[present]],
+                            edgecolor = 'gray', linewidth = 1)
+            ax.set_yticks(range(len(names)))
+            ax.set_yticklabels(names)
+            ax.set_ylim(len(names) - 0.5, -0.5)
+            ax.set_xlabel(price.name)
+            ax.set_ylabel(category.name)
+        else:
+            ax = sns.stripplot(x = price, y = category, jitter=True, linewidth=1)
+        ax.set_title(title)
+    return fig
+
+
+def installs_chart(paid_installs, free_installs):
+    # Box statistics computed on the server, so the chart doesn't carry every app
+    # Data for paid apps
+    trace0 = summaries.box_traces(paid_installs, 'Paid')
+
+    # Data for free apps
+    trace1 = summaries.box_traces(free_installs, 'Free')
+
+    layout = go.Layout(
+        title = "Number of downloads of paid apps vs. free apps",
+        yaxis = dict(title = "Log number of downloads",
+                    type = 'log',
+                    autorange = True)
+    )
+
+    # Add trace0 and trace1 to a list for plotting
+    return go.Figure(data=trace0 + trace1, layout=layout)
+
+
+def plot_sentiment_box_stats(stats):
+    with sns.axes_style('ticks'):
+        fig_7, ax = plt.subplots()
+        fig_7.set_size_inches(11, 8)
+
+        ax.bxp(stats)
+        ax.set_xlabel('Type')
+        ax.set_ylabel('Sentiment_Polarity')
+        ax.set_title('Sentiment Polarity Distribution')
+    return fig_7
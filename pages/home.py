@@ -1,6 +1,6 @@
 import streamlit as st 
-from PIL import  Image
-import numpy as np
+
+import images
 
 def app():
     st.markdown('''
@@ -26,9 +26,8 @@ def app():
         ''')
 
     with col2:
-        display = Image.open('./pages/datasets/photo.jpg')
-        display = np.array(display)
-        st.image(display, width = 300)
+        # Decoded and resized once per process, not on every visit
+        images.image('photo.jpg', width = 300)
 
     
 
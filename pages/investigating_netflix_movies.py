@@ -2,7 +2,16 @@ import streamlit as st
 import pandas as pd 
 import matplotlib.pyplot as plt
 import seaborn as sns
+import density
+import figure_cache
+from data_loader import load_prepared
+from styles import map_styles
 
+# Colors marking the non-feature film genres, every other genre is black
+GENRE_COLORS = {"Children": "red", "Documentaries": "blue", "Stand-Up": "green"}
+
+# The text of the page is shown first, its matplotlib figures fill their places once rendered
+@figure_cache.progressive()
 def app():
 
     st.markdown('''
@@ -15,8 +24,8 @@ def app():
         As evidence of this, they have provided us with the following information. For the years from 2011 to 2020, the average movie durations are 103, 101, 99, 100, 100, 95, 95, 96, 93, and 90, respectively.
     ''')
 
-    # Read in the CSV as a DataFrame
-    netflix_df = pd.read_csv('./pages/datasets/netflix_data.csv')
+    # Read in the CSV as a DataFrame (precompiled, see data_loader.PREPARED)
+    netflix_df = load_prepared('netflix')
 
     # Create the years and durations lists
     years = [2011, 2012, 2013, 2014, 2015, 2016, 2017, 2018, 2019, 2020]
@@ -28,18 +37,8 @@ def app():
     # Create a DataFrame from the dictionary
     durations_df = pd.DataFrame(movie_dict)
 
-    fig_1, ax_1= plt.subplots()
-
-    # Draw a line plot of release_years and durations
-    ax_1 = plt.plot(durations_df["years"], durations_df["durations"])
-
-    # Create a title
-    plt.title("Netflix Movie Durations 2011-2020")
-    plt.xlabel('Release Year')
-    plt.ylabel('Duration (min)')
-
     # Show the plot
-    st.pyplot(fig_1)
+    figure_cache.pyplot(plot_durations, durations_df)
 
     st.markdown('''
         ## Loading the rest of the data
@@ -80,19 +79,7 @@ def app():
     ''')
 
     # Create the scatter plot figure 
-
-    fig_2, ax_2 = plt.subplots()
-    ax_2 = sns.scatterplot(data = netflix_df_movies_only, x = "release_year", y = "duration")
-
-    # Set title
-    plt.title('Movie Duration by Year of Release')
-    # Set x-axis label
-    plt.xlabel('Release Year')
-    # Set y-axis label
-    plt.ylabel('Duration')
-
-    # Show the plot
-    st.pyplot(fig_2)
+    figure_cache.pyplot(plot_duration_by_year, netflix_df_movies_only[["release_year", "duration"]])
 
     st.markdown('''
         ## Digging deeper
@@ -116,34 +103,11 @@ def app():
         We could eliminate these rows from our DataFrame and plot the values again. But another interesting way to explore the effect of these genres on our data would be to plot them, but mark them with a different color.
     ''')
 
-    # Define an empty list
-    colors = []
-
-    # Iterate over rows of netflix_movies_col_subset
-    for label,row in netflix_movies_col_subset.iterrows():
-        if row["genre"] == "Children":
-            colors.append("red")
-        elif row["genre"] == "Documentaries":
-            colors.append("blue")
-        elif row["genre"] == "Stand-Up":
-            colors.append("green")
-        else:
-            colors.append("black")
-
-    # Set the figure style and initalize a new figure
-    plt.style.use('fivethirtyeight')
-    fig_3, ax_3 = plt.subplots()
-
-    # Create a scatter plot of duration versus release_year
-    ax_3 = plt.scatter(netflix_df_movies_only[["release_year"]], netflix_df_movies_only[["duration"]], color = colors)
-
-    # Create a title and axis labels
-    plt.title("Movie duration by year of release")
-    plt.xlabel("Release year")
-    plt.ylabel("Duration (min)")
+    # Color of each movie according to its genre
+    colors = map_styles(netflix_movies_col_subset["genre"], GENRE_COLORS, "black")
 
     # Show the plot
-    st.pyplot(fig_3)
+    figure_cache.pyplot(plot_duration_by_genre, netflix_df_movies_only[["release_year", "duration"]], colors)
 
     st.markdown('''
         These allowed us to visualize the genres responsible for the decrease in the average length of the films.
@@ -151,3 +115,53 @@ def app():
         Well, as we suspected, non-typical genres such as children's movies (red) and documentaries (blue) are all clustered around the bottom half of the plot.
     ''')
 
+
+# Figures of the page, rendered through figure_cache from the data passed as arguments
+
+def plot_durations(durations_df):
+    fig_1, ax_1= plt.subplots()
+
+    # Draw a line plot of release_years and durations
+    ax_1.plot(durations_df["years"], durations_df["durations"])
+
+    # Create a title
+    ax_1.set_title("Netflix Movie Durations 2011-2020")
+    ax_1.set_xlabel('Release Year')
+    ax_1.set_ylabel('Duration (min)')
+    return fig_1
+
+
+def plot_duration_by_year(movies):
+    fig_2, ax_2 = plt.subplots()
+    if density.is_dense(movies):
+        # Hexagonal density instead of a marker per movie
+        density.hexbin(ax_2, movies["release_year"], movies["duration"])
+    else:
+        ax_2 = sns.scatterplot(data = movies, x = "release_year", y = "duration", ax = ax_2)
+
+    # Set title
+    ax_2.set_title('Movie Duration by Year of Release')
+    # Set x-axis label
+    ax_2.set_xlabel('Release Year')
+    # Set y-axis label
+    ax_2.set_ylabel('Duration')
+    return fig_2
+
+
+def plot_duration_by_genre(movies, colors):
+    # Set the figure style and initalize a new figure
+    with plt.style.context('fivethirtyeight'):
+        fig_3, ax_3 = plt.subplots()
+
+        # Create a scatter plot of duration versus release_year
+        if density.is_dense(movies):
+            # One marker per group of close movies of the same color, larger for more movies
+            density.scatter(ax_3, movies["release_year"], movies["duration"], color = colors)
+        else:
+            ax_3.scatter(movies["release_year"], movies["duration"], color = colors)
+
+        # Create a title and axis labels
+        ax_3.set_title("Movie duration by year of release")
+        ax_3.set_xlabel("Release year")
+        ax_3.set_ylabel("Duration (min)")
+    return fig_3
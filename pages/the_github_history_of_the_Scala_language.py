@@ -1,8 +1,14 @@
-import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
 import plotly.graph_objs as go
-
+import figure_cache
+from data_loader import load_prepared
+from pull_aggregates import load_aggregates
+from pull_index import load_index
+from pull_store import load_store
+
+# The text of the page is shown first, its matplotlib figures fill their places once rendered
+@figure_cache.progressive()
 def app():
     st.markdown('''
         # Scala's real-world project repository data
@@ -21,18 +27,14 @@ def app():
     ''')
 
     # Loading in the data
-    pulls_one = pd.read_csv('./pages/datasets/pulls_2011-2013.csv')
-    pulls_two = pd.read_csv('./pages/datasets/pulls_2014-2018.csv')
-    pull_files = pd.read_csv('./pages/datasets/pull_files.csv')
-
-    # Append pulls_one to pulls_two
-    pulls = pulls_one.append(pulls_two, ignore_index=True)
-
-    # Convert the date for the pulls object
-    pulls['date'] = pd.to_datetime(pulls['date'], utc=True)
+    # Pull requests partitioned by year in date order (see pull_store.PullStore)
+    store = load_store()
+    pull_files = load_prepared('pull_files')
 
-    # Merge the two DataFrames
-    data = pulls.merge(pull_files, on='pid')
+    # Counts of the pull requests merged with the files they changed, computed once per process
+    aggregates = load_aggregates()
+    # File and user indexes of the pull requests, for the selectable file and developers
+    index = load_index()
 
     st.markdown('''
     ##  Is the project still actively maintained?
@@ -44,19 +46,9 @@ def app():
     For Scala, we will do this by plotting a chart of the project's activity. We will calculate the number of pull requests submitted each year during the project's lifetime. We will then plot these numbers to see the trend of contributions.
     ''')
 
-    # Create a column that will store the month
-    data['month'] = data['date'].dt.month
-
-    # Create a column that will store the year
-    data['year'] = data['date'].dt.year
-
-    # Show the plot
-    fig1, ax1 = plt.subplots()
-    data.groupby('year')['pid'].count().plot(kind='bar', ax=ax1, figsize = (12,4))
-    ax1.set_xlabel('Year')
-    ax1.set_ylabel('N° of contibutions')
-    ax1.set_title('Number of contributions per year')
-    st.pyplot(fig1)
+    # Pull requests of each year, counted by binary search in the year partitions; show the plot
+    pulls_per_year = store.counts('year').rename(lambda start: start.year)
+    figure_cache.pyplot(plot_contributions_per_year, pulls_per_year)
 
     st.markdown('''
     ## Is there camaraderie in the project?
@@ -65,16 +57,8 @@ def app():
 
     In order to evaluate the dynamics of the community, we will plot a bar chart of the number of pull requests submitted by each user. The plot shows that there are few people that only contribute a small number of pull requests can be used as in indicator that the project is not welcoming of new contributors.
     ''')
-    fig2 = go.Figure()
-    x2 = data.groupby('user')['pid'].count()
-    fig2.add_trace(go.Bar(x=x2.index, y=x2, name='Mean'))
-    fig2.update_layout(
-        xaxis_title="Users",
-        yaxis_title="N° of contributions",
-    )
-    
-    #fig.show()
-    st.plotly_chart(fig2, use_container_width=True)
+    x2 = aggregates.user_counts
+    figure_cache.plotly_chart(contributions_per_user_chart, x2)
 
     st.markdown('''
     ## What files were changed in the last ten pull requests?
@@ -83,8 +67,8 @@ def app():
     ''')
 
     # Identify the last 10 pull requests
-    last_10 = pulls.sort_values(by = 'date').tail(10)
-    joined_pr = pull_files.merge(last_10, on='pid')
+    last_10 = store.latest(10)
+    joined_pr = pull_files[pull_files['pid'].isin(last_10['pid'])].merge(last_10, on='pid')
     st.write(joined_pr)
 
     st.markdown('''
@@ -95,17 +79,14 @@ def app():
     We identified *src/compiler/scala/reflect/reify/phases/Calculate.scala* as being recently changed. We are interested in the top 3 developers who changed that file. Those developers are the ones most likely to have the best understanding of the code.
     ''')
 
-    # This is the file we are interested in:
-    file = 'src/compiler/scala/reflect/reify/phases/Calculate.scala'
-
-    # Identify the commits that changed the file
-    file_pr = data[data['file'] == file]
-
-    # Count the number of changes made by each developer
-    author_counts = file_pr.groupby('user').count()
+    # This is the file we are interested in (any other file or directory can be selected)
+    paths = index.paths()
+    default_file = 'src/compiler/scala/reflect/reify/phases/Calculate.scala'
+    file = st.selectbox('File or directory', paths,
+                        index=paths.index(default_file) if default_file in paths else 0)
 
     # Print the top 3 developers
-    st.write(author_counts.nlargest(3, 'file'))
+    st.write(index.top_contributors(file, 3))
 
     st.markdown('''
     ## Who made the last ten pull requests on a given file?
@@ -115,14 +96,8 @@ def app():
     We will look at the history of *src/compiler/scala/reflect/reify/phases/Calculate.scala*.
     ''')
 
-    # Select the pull requests that changed the target file
-    file_pr = pull_files[pull_files['file'] == file]
-
-    # Merge the obtained results with the pulls DataFrame
-    joined_pr = pulls.merge(file_pr, on='pid')
-
-    # Find the users of the last 10 most recent pull requests
-    users_last_10 = joined_pr.nlargest(10, 'date')
+    # Find the users of the last 10 most recent pull requests that changed the target file
+    users_last_10 = index.latest(file, 10)
 
     # Printing the results
     st.write(users_last_10)
@@ -133,24 +108,15 @@ def app():
     Now that we have identified two potential contacts in the projects, we need to find the person who was most involved in the project in recent times. That person is most likely to answer our questions. For each calendar year, we are interested in understanding the number of pull requests the authors submitted. This will give us a high-level image of their contribution trend to the project.
     ''')
     # The developers we are interested in
-    authors = ['xeno-by', 'soc']
+    authors = st.multiselect('Developers', list(index.users),
+                             default=[user for user in ['xeno-by', 'soc'] if user in index.users])
 
-    # Get all the developers' pull requests
-    by_author = pulls[pulls['user'].isin(authors)]
-
-    # Count the number of pull requests submitted each year
-    counts = by_author.groupby(['user', by_author['date'].dt.year]).agg({'pid': 'count'}).reset_index()
-
-    # Convert the table to a wide format
-    counts_wide = counts.pivot_table(index='date', columns='user', values='pid', fill_value=0)
+    # Number of pull requests submitted each year by the developers, in a wide format
+    counts_wide = aggregates.user_year_counts(authors)
 
     # Plot the results
-    fig3, ax3 = plt.subplots()
-    counts_wide.plot(kind='bar', ax=ax3)
-    ax3.set_xlabel('Year')
-    ax3.set_ylabel('N° of pull requests')
-    ax3.set_title('Number of contributions per year')
-    st.pyplot(fig3)
+    if not counts_wide.empty:
+        figure_cache.pyplot(plot_pull_requests_per_year, counts_wide)
 
     st.markdown('''
     ## Visualizing the contributions of each developer
@@ -158,22 +124,41 @@ def app():
     As mentioned before, it is important to make a distinction between the global expertise and contribution levels and the contribution levels at a more granular level (file, submodule, etc.) In our case, we want to see which of our two developers of interest have the most experience with the code in a given file (*src/compiler/scala/reflect/reify/phases/Calculate.scala*). We will measure experience by the number of pull requests submitted that affect that file and how recent those pull requests were submitted.
     ''')
 
-    # Select the pull requests submitted by the authors, from the `data` DataFrame
-    by_author = data[data['user'].isin(authors)]
+    # Number of pull requests of the authors that affect the file each year, in a wide format
+    by_file_wide = index.user_year_counts(authors, path=file)
 
-    # Select the pull requests that affect the file
-    by_file = by_author[by_author['file'] == file]
+    # Plot the results
+    if by_file_wide.empty:
+        st.write('The selected developers made no pull requests on', file)
+    else:
+        figure_cache.pyplot(plot_pull_requests_per_year, by_file_wide)
 
-    # Group and count the number of PRs done by each user each year
-    grouped = by_file.groupby(['user', by_file['date'].dt.year]).count()['pid'].reset_index()
 
-    # Transform the data into a wide format
-    by_file_wide = grouped.pivot_table(index='date', columns='user', values='pid', fill_value=0)
+# Figures of the page, rendered through figure_cache from the data passed as arguments
 
-    # Plot the results
-    fig4, ax4 = plt.subplots()
-    by_file_wide.plot(kind='bar', ax=ax4)
-    ax4.set_xlabel('Year')
-    ax4.set_ylabel('N° of pull requests')
-    ax4.set_title('Number of contributions per year')
-    st.pyplot(fig4)
+def plot_contributions_per_year(counts):
+    fig1, ax1 = plt.subplots()
+    counts.plot(kind='bar', ax=ax1, figsize = (12,4))
+    ax1.set_xlabel('Year')
+    ax1.set_ylabel('N° of contibutions')
+    ax1.set_title('Number of contributions per year')
+    return fig1
+
+
+def contributions_per_user_chart(x2):
+    fig2 = go.Figure()
+    fig2.add_trace(go.Bar(x=x2.index, y=x2, name='Mean'))
+    fig2.update_layout(
+        xaxis_title="Users",
+        yaxis_title="N° of contributions",
+    )
+    return fig2
+
+
+def plot_pull_requests_per_year(counts_wide):
+    fig, ax = plt.subplots()
+    counts_wide.plot(kind='bar', ax=ax)
+    ax.set_xlabel('Year')
+    ax.set_ylabel('N° of pull requests')
+    ax.set_title('Number of contributions per year')
+    return fig
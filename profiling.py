@@ -0,0 +1,194 @@
+"""
+Performance instrumentation of the page renders.
+
+``MultiPage.run`` times every page render, and the shared helpers (data
+loading, cleaning, aggregation, figure rendering) time themselves as named
+sections of the render in progress: load, clean, aggregate, plot, serialize.
+Section times are inclusive of the sections nested in them.
+
+Each render is logged as one JSON line on the "portfolio.metrics" logger,
+appended to PORTFOLIO_METRICS_FILE when it is set, and kept in memory for the
+sidebar debug panel shown with PORTFOLIO_DEBUG=1. PORTFOLIO_TRACE_MEMORY=1
+also traces the Python allocations to report the peak memory of each render;
+it slows the renders down and mixes the allocations of concurrent sessions.
+"""
+
+# Import necessary libraries
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+DEBUG = os.environ.get('PORTFOLIO_DEBUG', '') not in ('', '0')
+TRACE_MEMORY = os.environ.get('PORTFOLIO_TRACE_MEMORY', '') not in ('', '0')
+METRICS_FILE = os.environ.get('PORTFOLIO_METRICS_FILE')
+
+logger = logging.getLogger('portfolio.metrics')
+
+# Last renders of every session, oldest first
+history = deque(maxlen=1000)
+_lock = threading.Lock()
+
+# Streamlit runs the script of each session in its own thread
+_current = threading.local()
+
+
+class PageProfile:
+    """Timings of one page render.
+
+    Args:
+        title ([str]): Title of the rendered page
+    """
+    def __init__(self, title) -> None:
+        self.title = title
+        self.started = time.time()
+        self.seconds = None
+        # Section name -> [total seconds, number of calls]
+        self.sections = {}
+        self.peak_bytes = None
+        self.max_rss_bytes = None
+        self.error = None
+
+    def add(self, name, seconds) -> None:
+        total = self.sections.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            'page': self.title,
+            'started': self.started,
+            'seconds': self.seconds,
+            'sections': {name: {'seconds': seconds, 'calls': calls}
+                         for name, (seconds, calls) in self.sections.items()},
+            'peak_bytes': self.peak_bytes,
+            'max_rss_bytes': self.max_rss_bytes,
+            'error': self.error,
+        }
+
+
+def current():
+    """Profile of the render running in this thread, None outside of a render."""
+    return getattr(_current, 'profile', None)
+
+
+@contextlib.contextmanager
+def section(name):
+    """Time a block as a named section of the render in progress (no-op outside a render).
+
+    Args:
+        name ([str]): Name of the section, e.g. "load" or "plot"
+    """
+    profile = current()
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+def _max_rss_bytes():
+    """High watermark of the resident memory of the process."""
+    if resource is None:
+        return None
+    # Reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextlib.contextmanager
+def profile_page(title):
+    """Time a page render and record it in the history, the log and the metrics file.
+
+    Args:
+        title ([str]): Title of the rendered page
+    """
+    profile = PageProfile(title)
+    _current.profile = profile
+
+    if TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # Also resets the peak, which then only covers this render
+        tracemalloc.clear_traces()
+
+    start = time.perf_counter()
+    try:
+        yield profile
+    except Exception as error:
+        profile.error = repr(error)
+        raise
+    finally:
+        profile.seconds = time.perf_counter() - start
+        if TRACE_MEMORY:
+            profile.peak_bytes = tracemalloc.get_traced_memory()[1]
+        profile.max_rss_bytes = _max_rss_bytes()
+        _current.profile = None
+        record(profile)
+
+
+def record(profile) -> None:
+    """Keep a finished render in the history and publish it as a JSON line."""
+    line = json.dumps(profile.as_dict())
+
+    with _lock:
+        history.append(profile)
+        if METRICS_FILE:
+            with open(METRICS_FILE, 'a') as metrics:
+                metrics.write(line + '\n')
+
+    logger.info(line)
+
+
+def summary() -> dict:
+    """Render statistics of every page over the history: count, mean, p95 and max seconds."""
+    with _lock:
+        renders = list(history)
+
+    by_page = {}
+    for profile in renders:
+        by_page.setdefault(profile.title, []).append(profile.seconds)
+
+    stats = {}
+    for title, seconds in by_page.items():
+        seconds = sorted(seconds)
+        stats[title] = {
+            'renders': len(seconds),
+            'mean': sum(seconds) / len(seconds),
+            'p95': seconds[min(len(seconds) - 1, int(0.95 * len(seconds)))],
+            'max': seconds[-1],
+        }
+    return stats
+
+
+def debug_panel(profile) -> None:
+    """Show the timings of a render and of the past renders in the sidebar.
+
+    Args:
+        profile ([PageProfile]): Render to detail
+    """
+    import streamlit as st
+
+    st.sidebar.markdown('### Performance')
+    st.sidebar.write('Render time (s) = ', round(profile.seconds, 3))
+    st.sidebar.write({name: f'{seconds:.3f} s ({calls} calls)'
+                      for name, (seconds, calls) in profile.sections.items()})
+    if profile.peak_bytes is not None:
+        st.sidebar.write('Peak traced memory (MB) = ', round(profile.peak_bytes / 2 ** 20, 1))
+    if profile.max_rss_bytes is not None:
+        st.sidebar.write('Max RSS of the process (MB) = ', round(profile.max_rss_bytes / 2 ** 20, 1))
+
+    st.sidebar.markdown('#### Past renders')
+    st.sidebar.write(summary())
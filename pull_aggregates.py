@@ -0,0 +1,107 @@
+"""
+Materialized pull request counts for the Scala GitHub history page.
+
+The page used to merge every pull request with the files it changed and group
+the result on every view. The counts are computed once here, and when the
+files gain new pull requests the previous counts are updated with those only.
+The per-file queries are answered by ``pull_index.PullIndex``.
+"""
+
+# Import necessary libraries
+import copy
+
+import pandas as pd
+
+from data_loader import cached, dataset_path, load_prepared, previous_version
+from profiling import section
+
+# Raw files the aggregates are derived from
+SOURCES = ['pulls_2011-2013.csv', 'pulls_2014-2018.csv', 'pull_files.csv']
+
+
+def _add(total, new) -> pd.Series:
+    """Sum of two count series aligned on their index."""
+    if total.empty:
+        return new.sort_index()
+    return total.add(new, fill_value=0).astype(int).sort_index()
+
+
+class PullAggregates:
+    """Pull request counts per user and per (user, year), updated incrementally.
+
+    Counts "per file change" follow the page: a pull request is counted once per
+    file it changed (i.e. per row of pulls merged with pull_files).
+    """
+    def __init__(self) -> None:
+        # Pull requests already counted
+        self.pids = pd.Index([], dtype='int64')
+        # File changes counted, and per user
+        self.changes = 0
+        self.user_counts = pd.Series(dtype='int64')
+        # Pull requests per (user, year)
+        self.user_year = pd.Series(dtype='int64')
+
+    def update(self, pulls, pull_files) -> 'PullAggregates':
+        """Count the pull requests not seen before.
+
+        Args:
+            pulls ([pd.DataFrame]): Pull requests with pid, user and a UTC date column
+
+            pull_files ([pd.DataFrame]): Files changed by the pull requests (pid, file)
+        """
+        new = pulls[~pulls['pid'].isin(self.pids)]
+        if new.empty:
+            return self
+
+        new = new.assign(year=new['date'].dt.year)
+        changes = new.merge(pull_files[pull_files['pid'].isin(new['pid'])], on='pid')
+
+        self.pids = self.pids.append(pd.Index(new['pid'].unique()))
+        self.changes += len(changes)
+        self.user_counts = _add(self.user_counts, changes.groupby('user', observed=True).size())
+        self.user_year = _add(self.user_year, new.groupby(['user', 'year'], observed=True).size())
+
+        return self
+
+    def counted_in(self, pulls, pull_files) -> bool:
+        """Whether the files still hold every pull request and file change counted, so ``update`` can add the new ones.
+
+        Args:
+            pulls ([pd.DataFrame]): Pull requests with pid, user and a UTC date column
+
+            pull_files ([pd.DataFrame]): Files changed by the pull requests (pid, file)
+        """
+        return bool(self.pids.isin(pulls['pid']).all()
+                    and pull_files['pid'].isin(self.pids).sum() == self.changes)
+
+    def user_year_counts(self, users) -> pd.DataFrame:
+        """Wide table of the yearly pull requests of some users, one column per user.
+
+        Args:
+            users ([list]): Users to include
+        """
+        if self.user_year.empty:
+            return pd.DataFrame()
+
+        counts = self.user_year[self.user_year.index.isin(users, level='user')]
+        return counts.unstack('user', fill_value=0).sort_index()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the counts, for the cache accounting."""
+        series = [self.user_counts, self.user_year]
+        return int(self.pids.nbytes + sum(s.memory_usage(deep=True) for s in series))
+
+
+def load_aggregates() -> PullAggregates:
+    """Aggregates of the current pull request files, updated with the new pull requests when they change."""
+    def build():
+        pulls, pull_files = load_prepared('pulls'), load_prepared('pull_files')
+        previous = previous_version('pull_aggregates')
+        with section('aggregate'):
+            # The files only gained pull requests: count the new ones, on a copy shared with no session
+            if previous is not None and previous.counted_in(pulls, pull_files):
+                return copy.copy(previous).update(pulls, pull_files)
+            return PullAggregates().update(pulls, pull_files)
+
+    return cached('pull_aggregates', [dataset_path(source) for source in SOURCES], build)
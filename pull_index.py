@@ -0,0 +1,152 @@
+"""
+Inverted indexes over the Scala pull requests, for interactive file/author queries.
+
+Selecting another file or author on the Scala page would otherwise mean a
+boolean mask over every (pull request, file) row. The indexes map each file
+and each user to the positions of its pull requests, in date order, so any
+query only touches the pull requests it returns. Files are kept sorted, which
+makes every directory a contiguous range of them (found by binary search).
+"""
+
+# Import necessary libraries
+import numpy as np
+import pandas as pd
+
+from data_loader import cached, dataset_path, load_prepared
+from profiling import section
+
+# Raw files the index is derived from
+SOURCES = ['pulls_2011-2013.csv', 'pulls_2014-2018.csv', 'pull_files.csv']
+
+# Sorts after any character a path can contain, to bound a directory range
+_LAST_CHAR = '\U0010ffff'
+
+
+def _postings(keys, rows) -> tuple:
+    """Sorted distinct keys, offsets of each key in the rows array, and the rows grouped by key.
+
+    The rows of key ``keys[i]`` are ``rows[offsets[i]:offsets[i + 1]]``, in increasing order.
+    """
+    codes, uniques = pd.factorize(keys, sort=True)
+    known = codes >= 0
+    codes, rows = codes[known], rows[known]
+
+    order = np.lexsort((rows, codes))
+    offsets = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return np.asarray(uniques, dtype=object), offsets, rows[order]
+
+
+class PullIndex:
+    """File -> pull requests and user -> pull requests indexes.
+
+    Args:
+        pulls ([pd.DataFrame]): Pull requests with pid, user and a UTC date column
+
+        pull_files ([pd.DataFrame]): Files changed by the pull requests (pid, file)
+    """
+    def __init__(self, pulls, pull_files) -> None:
+        # Pull requests in date order; the indexes store positions in this frame
+        self.pulls = pulls.sort_values('date', kind='mergesort').reset_index(drop=True)
+        self.years = self.pulls['date'].dt.year.to_numpy()
+
+        positions = pd.DataFrame({'pid': self.pulls['pid'], 'row': np.arange(len(self.pulls))})
+        changes = pull_files.merge(positions, on='pid')
+
+        self.files, self._file_offsets, self._file_rows = _postings(
+            changes['file'].to_numpy(dtype=object), changes['row'].to_numpy())
+        self.users, self._user_offsets, self._user_rows = _postings(
+            self.pulls['user'].to_numpy(dtype=object), np.arange(len(self.pulls)))
+
+        # Every directory containing a file, e.g. "src/" and "src/compiler/"
+        directories = {file[:end + 1] for file in self.files for end, char in enumerate(file) if char == '/'}
+        self.directories = np.array(sorted(directories), dtype=object)
+
+    def paths(self) -> list:
+        """Directories (ending with "/") and files that can be queried."""
+        return list(self.directories) + list(self.files)
+
+    def rows(self, path) -> np.ndarray:
+        """Positions of the pull requests that changed a file, or any file of a directory.
+
+        Args:
+            path ([str]): Path of a file, or of a directory when it ends with "/"
+        """
+        if path.endswith('/'):
+            start = np.searchsorted(self.files, path, side='left')
+            stop = np.searchsorted(self.files, path + _LAST_CHAR, side='left')
+        else:
+            start = np.searchsorted(self.files, path, side='left')
+            stop = np.searchsorted(self.files, path, side='right')
+
+        rows = self._file_rows[self._file_offsets[start]:self._file_offsets[stop]]
+        # Several files may share pull requests, a single file is already sorted and unique
+        return np.unique(rows) if stop - start > 1 else rows
+
+    def user_rows(self, user) -> np.ndarray:
+        """Positions of the pull requests of a user.
+
+        Args:
+            user ([str]): GitHub login of the user
+        """
+        start = np.searchsorted(self.users, user, side='left')
+        stop = np.searchsorted(self.users, user, side='right')
+        return self._user_rows[self._user_offsets[start]:self._user_offsets[stop]]
+
+    def top_contributors(self, path, n=3) -> pd.Series:
+        """Users with the most pull requests on a file or directory.
+
+        Args:
+            path ([str]): Path of a file, or of a directory when it ends with "/"
+
+            n ([int]): Number of users to return
+        """
+        users = self.pulls['user'].to_numpy()[self.rows(path)]
+        return pd.Series(users).value_counts().head(n).rename('N° of pull requests')
+
+    def latest(self, path, n=10) -> pd.DataFrame:
+        """Most recent pull requests on a file or directory, newest first.
+
+        Args:
+            path ([str]): Path of a file, or of a directory when it ends with "/"
+
+            n ([int]): Number of pull requests to return
+        """
+        return self.pulls.iloc[self.rows(path)[::-1][:n]]
+
+    def user_year_counts(self, users, path=None) -> pd.DataFrame:
+        """Wide table of the yearly pull requests of some users, one column per user.
+
+        Args:
+            users ([list]): GitHub logins of the users
+
+            path ([str]): Only count the pull requests on this file or directory when given
+        """
+        path_rows = None if path is None else self.rows(path)
+
+        columns = {}
+        for user in users:
+            rows = self.user_rows(user)
+            if path_rows is not None:
+                rows = np.intersect1d(rows, path_rows, assume_unique=True)
+            if len(rows):
+                columns[user] = pd.Series(self.years[rows]).value_counts()
+
+        wide = pd.DataFrame(columns).fillna(0).astype(int).sort_index()
+        wide.index.name, wide.columns.name = 'year', 'user'
+        return wide
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the indexes and the pull requests, for the cache accounting."""
+        arrays = [self.years, self._file_offsets, self._file_rows, self._user_offsets, self._user_rows]
+        return int(self.pulls.memory_usage(deep=True).sum() + sum(array.nbytes for array in arrays))
+
+
+def load_index() -> PullIndex:
+    """Indexes of the current pull request files, built once per process."""
+    def build():
+        pulls, pull_files = load_prepared('pulls'), load_prepared('pull_files')
+        with section('aggregate'):
+            return PullIndex(pulls, pull_files)
+
+    return cached('pull_index', [dataset_path(source) for source in SOURCES], build)
@@ -0,0 +1,250 @@
+"""
+Year-partitioned store of the Scala pull requests, sorted by date.
+
+Each year of pull requests is kept as its own frame in date order, and
+published by ``build_datasets.py`` as one Feather file per year. Time queries
+(latest pull requests, a range of dates or years, counts per period) pick the
+partitions they need and binary-search the dates inside them, instead of
+sorting every pull request. When the files gain new pull requests, they are appended to
+their year's partition, or make a new one, without touching the other years:
+only those partitions are sorted again in memory and written again on disk.
+"""
+
+# Import necessary libraries
+import glob
+import os
+
+import pandas as pd
+
+import cleaning
+from data_loader import ARTIFACT_DIR, cached, dataset_path, load_prepared, previous_version, read_frame, write_frame
+from profiling import section
+
+# Raw files the store is derived from
+SOURCES = ['pulls_2011-2013.csv', 'pulls_2014-2018.csv']
+
+# Folder of the published partitions, one Feather file per year
+PARTITION_DIR = os.path.join(ARTIFACT_DIR, f'pulls.v{cleaning.VERSION}.partitions')
+
+# Months in each period of ``PullStore.counts``
+PERIOD_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+
+def _utc(moment) -> pd.Timestamp:
+    moment = pd.Timestamp(moment)
+    return moment.tz_localize('UTC') if moment.tzinfo is None else moment.tz_convert('UTC')
+
+
+class PullStore:
+    """Pull requests partitioned by year, each partition sorted by date.
+
+    Args:
+        frames ([list]): Frames of pull requests (pid, user, UTC date) to append
+    """
+    def __init__(self, frames=()) -> None:
+        # Year -> pull requests of the year in date order, by increasing year
+        self.partitions = {}
+        # Year -> dates of its partition, searched by the queries
+        self._dates = {}
+        for frame in frames:
+            self.append(frame)
+
+    def append(self, pulls) -> list:
+        """Add pull requests, only re-sorting the partitions of their years; return these years.
+
+        Args:
+            pulls ([pd.DataFrame]): Pull requests with pid, user and a UTC date column
+        """
+        years = []
+        for year, rows in pulls.groupby(pulls['date'].dt.year):
+            year = int(year)
+            years.append(year)
+            if year in self.partitions:
+                rows = pd.concat([self.partitions[year], rows], ignore_index=True)
+            self._set_partition(year, rows.sort_values('date', kind='mergesort', ignore_index=True))
+        return years
+
+    def copy(self) -> 'PullStore':
+        """Store sharing the partitions of this one, appended to without changing this one."""
+        store = PullStore()
+        store.partitions, store._dates = dict(self.partitions), dict(self._dates)
+        return store
+
+    def holds_only(self, pulls) -> bool:
+        """Whether every pull request of the store is still one of ``pulls``, so they can be appended.
+
+        Args:
+            pulls ([pd.DataFrame]): Pull requests with a pid column
+        """
+        return all(partition['pid'].isin(pulls['pid']).all() for partition in self.partitions.values())
+
+    def append_new(self, pulls) -> list:
+        """Append the pull requests the store does not hold yet; return the years of their partitions.
+
+        Args:
+            pulls ([pd.DataFrame]): Pull requests with pid, user and a UTC date column
+        """
+        held = pd.concat([partition['pid'] for partition in self.partitions.values()]) if self.partitions else []
+        return self.append(pulls[~pulls['pid'].isin(held)])
+
+    def _set_partition(self, year, partition) -> None:
+        self.partitions[year] = partition
+        self._dates[year] = pd.DatetimeIndex(partition['date'])
+        # Keep both mappings by increasing year, whatever the order partitions are added in
+        self.partitions = dict(sorted(self.partitions.items()))
+        self._dates = dict(sorted(self._dates.items()))
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def latest(self, n=10) -> pd.DataFrame:
+        """Most recent pull requests, oldest first, read from the last partitions only.
+
+        Args:
+            n ([int]): Number of pull requests to return
+        """
+        parts = []
+        for year in reversed(self.partitions):
+            if n <= 0:
+                break
+            part = self.partitions[year].iloc[-n:]
+            parts.append(part)
+            n -= len(part)
+        return self._concat(reversed(parts))
+
+    def between(self, start, end) -> pd.DataFrame:
+        """Pull requests with ``start <= date < end``, in date order.
+
+        Args:
+            start: First moment (timestamp or date string, UTC when naive)
+
+            end: Moment after the last one
+        """
+        start, end = _utc(start), _utc(end)
+        parts = []
+        for year in range(start.year, end.year + 1):
+            if year in self.partitions:
+                dates = self._dates[year]
+                parts.append(self.partitions[year].iloc[dates.searchsorted(start):dates.searchsorted(end)])
+        return self._concat(parts)
+
+    def years(self, first, last=None) -> pd.DataFrame:
+        """Pull requests of a range of years (both included), in date order.
+
+        Args:
+            first ([int]): First year
+
+            last ([int]): Last year, ``first`` by default
+        """
+        last = first if last is None else last
+        return self.between(f'{first}-01-01', f'{last + 1}-01-01')
+
+    def counts(self, period='month') -> pd.Series:
+        """Number of pull requests per calendar period, indexed by the start of the periods.
+
+        Args:
+            period ([str]): "month", "quarter" or "year"
+        """
+        months = PERIOD_MONTHS[period]
+        starts, counts = [], []
+        for year, dates in self._dates.items():
+            bounds = [pd.Timestamp(year=year, month=month, day=1, tz='UTC') for month in range(1, 13, months)]
+            bounds.append(pd.Timestamp(year=year + 1, month=1, day=1, tz='UTC'))
+            positions = dates.searchsorted(bounds)
+            starts.extend(bounds[:-1])
+            counts.extend(positions[1:] - positions[:-1])
+        return pd.Series(counts, index=pd.DatetimeIndex(starts, name='date'), name='pull requests', dtype='int64')
+
+    def _concat(self, parts) -> pd.DataFrame:
+        parts = list(parts)
+        if not parts:
+            return next(iter(self.partitions.values())).iloc[:0] if self.partitions else pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    def save(self, directory, years=None) -> None:
+        """Write partitions to a folder, one Feather file per year.
+
+        Args:
+            directory ([str]): Folder of the partitions
+
+            years ([list]): Years to write, all by default
+        """
+        os.makedirs(directory, exist_ok=True)
+        for year in self.partitions if years is None else years:
+            write_frame(self.partitions[year], os.path.join(directory, f'{year}.feather'))
+
+    @classmethod
+    def read(cls, directory) -> 'PullStore':
+        """Store of the partitions written to a folder by ``save``, memory-mapped.
+
+        Args:
+            directory ([str]): Folder of the partitions
+        """
+        store = cls()
+        for path in glob.glob(os.path.join(directory, '*.feather')):
+            store._set_partition(int(os.path.basename(path).split('.')[0]), read_frame(path))
+        return store
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the partitions, for the cache accounting."""
+        return int(sum(partition.memory_usage(deep=True).sum() for partition in self.partitions.values()))
+
+
+def is_published() -> bool:
+    """Whether the published partitions exist and are newer than the raw files."""
+    paths = glob.glob(os.path.join(PARTITION_DIR, '*.feather'))
+    if not paths:
+        return False
+    built = min(os.stat(path).st_mtime_ns for path in paths)
+    return all(os.stat(dataset_path(source)).st_mtime_ns <= built for source in SOURCES)
+
+
+def publish(append=True) -> list:
+    """Write the partitions of the current pull requests to ``PARTITION_DIR``; return the years written.
+
+    Args:
+        append ([bool]): Only write the partitions of the new pull requests when the
+            published ones still hold current pull requests only
+    """
+    pulls = load_prepared('pulls')
+    paths = glob.glob(os.path.join(PARTITION_DIR, '*.feather'))
+    store = PullStore.read(PARTITION_DIR) if append and paths else None
+
+    if store is not None and store.holds_only(pulls):
+        years = store.append_new(pulls)
+        store.save(PARTITION_DIR, years)
+        # The partitions not written again are up to date with the raw files as well
+        for path in paths:
+            os.utime(path)
+        return years
+
+    store = PullStore([pulls])
+    store.save(PARTITION_DIR)
+    # Years without any pull request any more, removed once the others are written
+    for path in paths:
+        if int(os.path.basename(path).split('.')[0]) not in store.partitions:
+            os.remove(path)
+    return list(store.partitions)
+
+
+def load_store() -> PullStore:
+    """Store of the current pull requests, from the published partitions when up to date.
+
+    When the raw files changed and the partitions are not published yet, the
+    new pull requests are appended to a copy of the previous store.
+    """
+    def build():
+        if is_published():
+            with section('load'):
+                return PullStore.read(PARTITION_DIR)
+        pulls = load_prepared('pulls')
+        previous = previous_version('pull_store')
+        with section('aggregate'):
+            if previous is not None and previous.holds_only(pulls):
+                store = previous.copy()
+                store.append_new(pulls)
+                return store
+            return PullStore([pulls])
+
+    return cached('pull_store', [dataset_path(source) for source in SOURCES], build)
@@ -0,0 +1,123 @@
+"""
+Background refresh of the datasets while the app is serving.
+
+``watch()`` starts a daemon thread scanning the datasets folder every
+REFRESH_SECONDS. Once the changed files have been left alone for a whole
+scan, the cached objects derived from them are rebuilt in the background (see
+``data_loader.refresh_stale``); the sessions keep getting the previous version
+of the data until the new one replaces it in the cache.
+
+A new version of a dataset can be dropped in from the command line:
+
+    python refresh.py path/to/pulls_2014-2018.csv [--as NAME]
+
+The file is copied next to the datasets and renamed over the previous version
+in a single step, so the app never reads a partial file, then the precompiled
+datasets are rebuilt.
+"""
+
+# Import necessary libraries
+import argparse
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+
+import data_loader
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans of the datasets folder, 0 to not watch it
+REFRESH_SECONDS = float(os.environ.get('PORTFOLIO_REFRESH_SECONDS', '5'))
+WATCH_THREAD_NAME = 'portfolio-watch'
+
+_watcher = None
+_watch_lock = threading.Lock()
+
+
+def scan() -> dict:
+    """Version of every file of the datasets folder: name -> (mtime, size)."""
+    stamps = {}
+    with os.scandir(data_loader.DATASET_DIR) as entries:
+        for entry in entries:
+            # Files being dropped in are only seen once renamed
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def _watch(interval) -> None:
+    seen = scan()
+    # Files changed since the last rebuild, possibly still being written
+    pending = set()
+    while True:
+        time.sleep(interval)
+        try:
+            current = scan()
+        except OSError as error:
+            logger.warning('Could not scan the datasets folder: %s', error)
+            continue
+
+        changed = {name for name in seen.keys() | current.keys() if seen.get(name) != current.get(name)}
+        seen = current
+        if changed:
+            pending |= changed
+        elif pending:
+            logger.info('Datasets changed: %s', ', '.join(sorted(pending)))
+            pending.clear()
+            stale = data_loader.refresh_stale()
+            if stale:
+                logger.info('Rebuilding in the background: %s', ', '.join(sorted(map(str, stale))))
+
+
+def watch(interval=REFRESH_SECONDS) -> None:
+    """Start watching the datasets folder in a daemon thread, once per process.
+
+    Args:
+        interval ([float]): Seconds between two scans, 0 to not watch
+    """
+    global _watcher
+
+    if interval <= 0:
+        return
+
+    with _watch_lock:
+        if _watcher is not None:
+            return
+        _watcher = threading.Thread(target=_watch, args=(interval,), name=WATCH_THREAD_NAME, daemon=True)
+        _watcher.start()
+
+
+def drop_in(path, name=None) -> str:
+    """Replace a dataset by a new version of the file in a single step; return its path.
+
+    Args:
+        path ([str]): New version of the file
+
+        name ([str]): File name in the datasets folder, the base name of ``path`` by default
+    """
+    target = data_loader.dataset_path(name or os.path.basename(path))
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    shutil.copyfile(path, tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Drop in a new version of a dataset of the portfolio.')
+    parser.add_argument('path', help='new version of the file')
+    parser.add_argument('--as', dest='name', help='file name in the datasets folder (same name by default)')
+    args = parser.parse_args(argv)
+
+    print(f'{args.path}: dropped in as {drop_in(args.path, args.name)}')
+
+    # Republish the precompiled datasets; the running servers rebuild their caches on their own
+    import build_datasets
+    return build_datasets.main([])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
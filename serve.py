@@ -0,0 +1,53 @@
+"""
+Entry point of the server: the warm-up of the pages starts at boot, then Streamlit serves app.py.
+
+Usage:
+    python serve.py [streamlit options, e.g. --server.port 8501]
+
+Streamlit only runs app.py when the first session connects, so the warm-up
+started there would begin with the first visitor, who would then wait for it.
+Here app.py is imported before the server starts: its pages are registered,
+their warm-up threads and the datasets watch are started, and the sessions
+find the caches filled (or being filled) when they run the script. A line is
+printed once every page is warm, with the start-up report of the server.
+"""
+
+# Import necessary libraries
+import os
+import sys
+import threading
+from concurrent.futures import wait
+
+import multipage
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(ROOT, 'app.py')
+
+
+def _report_when_warm(app) -> None:
+    wait(list(multipage.warmups.values()))
+    report = app.startup_report()
+    states = ', '.join(f'{title}: {state}' for title, state in report['warm-up'].items())
+    print(f"Warm-up over {report['uptime']:.1f} s after start ({states})", file=sys.stderr, flush=True)
+
+
+def main(argv=None) -> int:
+    sys.path.insert(0, ROOT)
+    # Registers the pages and starts their warm-up (and the datasets watch) in this process
+    import app
+
+    if multipage.warmups:
+        threading.Thread(target=_report_when_warm, args=(app.app,), name='portfolio-startup-report',
+                         daemon=True).start()
+
+    try:
+        from streamlit.web import cli as stcli
+    except ImportError:  # Streamlit < 1.12
+        from streamlit import cli as stcli
+
+    sys.argv = ['streamlit', 'run', APP] + list(sys.argv[1:] if argv is None else argv)
+    return stcli.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,4 +5,9 @@ headless = true\n\
 port = $PORT\n\
 enableCORS = false\n\
 \n\
-" > ~/.streamlit/config.toml
\ No newline at end of file
+" > ~/.streamlit/config.toml
+
+# Precompile the cleaned datasets so the pages don't clean the raw CSV files on every render.
+# With several server processes, set PORTFOLIO_SHARED_DIR (e.g. /dev/shm/portfolio) for all of
+# them: the datasets are published there once and mapped by every process.
+python build_datasets.py || echo "Dataset build failed, the pages will read the raw CSV files"
@@ -0,0 +1,29 @@
+"""
+Vectorized assignment of plot styles (colors, markers, ...) to categorical values.
+
+Looking the styles up through categorical codes replaces per-row Python loops
+such as ``iterrows()`` with an if/elif chain, so the cost stays a couple of
+array operations whatever the number of rows.
+"""
+
+# Import necessary libraries
+import numpy as np
+import pandas as pd
+
+
+def map_styles(values, mapping, default) -> np.ndarray:
+    """Style of each value, ``default`` for the values missing from ``mapping``.
+
+    Args:
+        values: Sequence or Series of categorical values (e.g. genres)
+
+        mapping ([dict]): Value -> style (e.g. {"Children": "red"})
+
+        default: Style of the values that are not in ``mapping``
+    """
+    # Unknown values get the code -1, which picks the default at the end of the lookup table
+    codes = pd.Categorical(values, categories=list(mapping)).codes
+    lookup = np.array(list(mapping.values()) + [default], dtype=object)
+
+    return lookup[codes]
+
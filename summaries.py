@@ -0,0 +1,158 @@
+"""
+Server-side summaries of raw columns for the Plotly charts.
+
+Plotly computes histograms and box plots in the browser, so every raw value
+is serialized into the chart and sent over the websocket. The bins, quartiles,
+whiskers and outliers are computed here with NumPy instead, and the charts
+only carry those few numbers, whatever the number of rows.
+
+The same rules summarize the histograms of ``chunked``, whose values are only
+known by bin, and ``bxp_stats`` hands the statistics to matplotlib.
+"""
+
+# Import necessary libraries
+import numpy as np
+import plotly.graph_objs as go
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def histogram(values, edges) -> np.ndarray:
+    """Number of values in each bin, ignoring missing values.
+
+    Args:
+        values: Numeric sequence or Series
+
+        edges: Increasing bin edges, as for ``np.histogram``
+    """
+    return np.histogram(_finite(values), edges)[0]
+
+
+def _rank(count, q) -> float:
+    """Rank (from 0) of the q quantile among count sorted values, where Plotly box plots place it."""
+    return min(max(q * count - 0.5, 0), count - 1)
+
+
+def quantile(sorted_values, q) -> float:
+    """Quantile of sorted values, interpolated the way Plotly box plots do it.
+
+    Args:
+        sorted_values ([np.ndarray]): Values in increasing order
+
+        q ([float]): Quantile between 0 and 1
+    """
+    return float(np.interp(_rank(len(sorted_values), q), np.arange(len(sorted_values)), sorted_values))
+
+
+def binned_quantile(edges, counts, q) -> float:
+    """Quantile of binned values, with the rank of ``quantile`` (NaN when empty).
+
+    The values of a bin are taken as evenly spread across it, so the value of
+    rank r lies where the cumulative count reaches r + 0.5.
+
+    Args:
+        edges: Increasing bin edges
+
+        counts: Number of values in each bin
+
+        q ([float]): Quantile between 0 and 1
+    """
+    cumulative = np.concatenate([[0], np.cumsum(counts)])
+    if cumulative[-1] == 0:
+        return np.nan
+    return float(np.interp(_rank(cumulative[-1], q) + 0.5, cumulative, edges))
+
+
+def _box(values, q1, median, q3) -> dict:
+    # The whiskers end at the most extreme values within 1.5 IQR of the box (never inside it)
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = values[(values >= low) & (values <= high)]
+
+    return {
+        'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': float(min(inside[0], q1)) if len(inside) else q1,
+        'upperfence': float(max(inside[-1], q3)) if len(inside) else q3,
+        'outliers': np.unique(values[(values < low) | (values > high)]),
+    }
+
+
+def box_stats(values) -> dict:
+    """Quartiles, whiskers and distinct outliers of a box plot, as Plotly computes them (None when empty).
+
+    The whiskers end at the most extreme values within 1.5 IQR of the box.
+
+    Args:
+        values: Numeric sequence or Series
+    """
+    values = np.sort(_finite(values))
+    if not len(values):
+        return None
+    return _box(values, *(quantile(values, q) for q in (0.25, 0.5, 0.75)))
+
+
+def binned_box_stats(edges, counts) -> dict:
+    """Statistics of ``box_stats`` for binned values (None when empty).
+
+    The quartiles come from ``binned_quantile`` and the values are placed at
+    the middle of their bin for the whiskers and outliers (one per bin).
+
+    Args:
+        edges: Increasing bin edges
+
+        counts: Number of values in each bin
+    """
+    edges, counts = np.asarray(edges, dtype=float), np.asarray(counts)
+    if not counts.any():
+        return None
+    # Middle of the bins holding values
+    values = ((edges[:-1] + edges[1:]) / 2)[counts > 0]
+    return _box(values, *(binned_quantile(edges, counts, q) for q in (0.25, 0.5, 0.75)))
+
+
+def bxp_stats(stats, label, mean=None) -> dict:
+    """Statistics of ``box_stats`` in the format of matplotlib's ``Axes.bxp``.
+
+    Args:
+        stats ([dict]): Statistics of ``box_stats`` or ``binned_box_stats``
+
+        label ([str]): Name of the box
+
+        mean ([float]): Mean of the values, drawn with ``showmeans``
+    """
+    return {
+        'label': label, 'q1': stats['q1'], 'med': stats['median'], 'q3': stats['q3'], 'mean': mean,
+        'whislo': stats['lowerfence'], 'whishi': stats['upperfence'], 'fliers': stats['outliers'],
+    }
+
+
+def box_traces(values, name) -> list:
+    """Box trace of precomputed statistics, plus a trace with its distinct outliers.
+
+    Args:
+        values: Numeric sequence or Series
+
+        name ([str]): Name (and x position) of the box
+    """
+    stats = box_stats(values)
+    if stats is None:
+        return []
+
+    box = go.Box(
+        name = name,
+        x = [name],
+        q1 = [stats['q1']], median = [stats['median']], q3 = [stats['q3']],
+        lowerfence = [stats['lowerfence']], upperfence = [stats['upperfence']],
+        legendgroup = name,
+    )
+    outliers = go.Scatter(
+        x = [name] * len(stats['outliers']),
+        y = stats['outliers'],
+        mode = 'markers',
+        name = name,
+        legendgroup = name,
+        showlegend = False,
+    )
+    return [box, outliers]
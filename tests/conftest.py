@@ -0,0 +1,37 @@
+"""
+Fixtures of the tests: the modules of the app are imported from the repository root.
+"""
+
+# Import necessary libraries
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_loader  # noqa: E402
+
+
+@pytest.fixture
+def datasets(tmp_path, monkeypatch):
+    """Empty datasets folder, served through an empty cache with background refresh."""
+    monkeypatch.setattr(data_loader, 'DATASET_DIR', str(tmp_path))
+    # No precompiled datasets: they are cleaned from the raw files
+    monkeypatch.setattr(data_loader, 'ARTIFACT_DIR', str(tmp_path / 'compiled'))
+    monkeypatch.setattr(data_loader, 'BACKGROUND_REFRESH', True)
+    monkeypatch.setattr(data_loader, '_cache', OrderedDict())
+    monkeypatch.setattr(data_loader, '_cache_bytes', 0)
+    monkeypatch.setattr(data_loader, '_build_locks', {})
+    monkeypatch.setattr(data_loader, '_builders', {})
+    monkeypatch.setattr(data_loader, '_versions', {})
+    monkeypatch.setattr(data_loader, '_pending_refresh', None)
+    monkeypatch.setattr(data_loader, '_refresh_pool', None)
+    monkeypatch.setattr(data_loader, '_pinned', threading.local())
+
+    yield tmp_path
+
+    if data_loader._refresh_pool is not None:
+        data_loader._refresh_pool.shutdown(wait=True)
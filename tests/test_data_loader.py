@@ -0,0 +1,214 @@
+"""
+Versions of the cached objects: what the script runs are served while the datasets change.
+"""
+
+# Import necessary libraries
+import os
+import threading
+import time
+
+import pytest
+
+import data_loader
+import pull_aggregates
+import pull_store
+
+# Longest wait for a background rebuild, in seconds
+TIMEOUT = 10
+
+
+class Files:
+    """Files of the datasets folder, each change given a later mtime than the previous one."""
+    def __init__(self, directory) -> None:
+        self.directory = directory
+        self.mtime = time.time_ns() - 3600 * 10 ** 9
+
+    def write(self, name, text) -> str:
+        path = self.directory / name
+        path.write_text(text)
+        self.mtime += 10 ** 9
+        os.utime(path, ns=(self.mtime, self.mtime))
+        return str(path)
+
+    def append(self, name, text) -> str:
+        return self.write(name, (self.directory / name).read_text() + text)
+
+
+def read(path) -> str:
+    with open(path) as file:
+        return file.read()
+
+
+def wait_for_refresh() -> None:
+    assert data_loader._pending_refresh is not None, 'no rebuild was scheduled'
+    data_loader._pending_refresh[1].result(TIMEOUT)
+
+
+def served(load):
+    """Object served to a new script run."""
+    with data_loader.pinned():
+        return load()
+
+
+@pytest.fixture
+def files(datasets):
+    return Files(datasets)
+
+
+def test_pinned_run_keeps_previous_version_during_rebuild(files):
+    path = files.write('a.csv', 'v1')
+    release = threading.Event()
+
+    def build():
+        content = read(path)
+        if content != 'v1':
+            assert release.wait(TIMEOUT)
+        return content
+
+    def load():
+        return data_loader.cached('a', [path], build)
+
+    assert served(load) == 'v1'
+    with data_loader.pinned():
+        files.write('a.csv', 'v2')
+        # The change schedules the rebuild, which is held until released
+        assert load() == 'v1'
+        assert load() == 'v1'
+        # Runs started while the rebuild is in flight get the previous version as well
+        assert served(load) == 'v1'
+        assert not data_loader._pending_refresh[1].done()
+
+        release.set()
+        wait_for_refresh()
+
+    assert served(load) == 'v2'
+    assert [key[2] for key in data_loader._cache] == [((path, files.mtime),)]
+
+
+def test_dependent_objects_are_published_together(files):
+    child_path = files.write('child.csv', 'a1')
+    parent_path = files.write('parent.csv', 'b')
+    child_built, release = threading.Event(), threading.Event()
+
+    def child():
+        return data_loader.cached('child', [child_path], lambda: read(child_path))
+
+    def build_parent():
+        value = child() + '+' + read(parent_path)
+        if value != 'a1+b':
+            child_built.set()
+            assert release.wait(TIMEOUT)
+        return value
+
+    def parent():
+        return data_loader.cached('parent', [child_path, parent_path], build_parent)
+
+    def both():
+        return child(), parent()
+
+    assert served(both) == ('a1', 'a1+b')
+
+    files.write('child.csv', 'a2')
+    served(parent)
+    assert child_built.wait(TIMEOUT)
+    # The child is rebuilt but not published before the parent is
+    assert any(value == 'a2' for value, _ in data_loader._cache.values())
+    assert served(both) == ('a1', 'a1+b')
+
+    release.set()
+    wait_for_refresh()
+    assert served(both) == ('a2', 'a2+b')
+    assert len(data_loader._cache) == 2
+
+
+def test_failed_rebuild_keeps_previous_version(files):
+    path = files.write('a.csv', 'v1')
+
+    def build():
+        content = read(path)
+        if content == 'broken':
+            raise ValueError(content)
+        return content
+
+    def load():
+        return data_loader.cached('a', [path], build)
+
+    assert served(load) == 'v1'
+    published = dict(data_loader._versions)
+
+    files.write('a.csv', 'broken')
+    assert served(load) == 'v1'
+    wait_for_refresh()
+    assert served(load) == 'v1'
+    assert data_loader._versions == published
+    assert len(data_loader._cache) == 1
+
+    # The next change of the file is rebuilt and published
+    files.write('a.csv', 'v2')
+    assert served(load) == 'v1'
+    wait_for_refresh()
+    assert served(load) == 'v2'
+
+
+PULLS_ONE = '''pid,user,date
+1,alice,2012-03-01T10:00:00Z
+2,bob,2012-07-15T08:30:00Z
+3,alice,2013-01-20T12:00:00Z
+'''
+
+PULLS_TWO = '''pid,user,date
+4,carol,2014-02-02T09:00:00Z
+5,bob,2014-11-30T23:59:59Z
+'''
+
+PULL_FILES = '''pid,file
+1,src/library/scala/List.scala
+1,src/library/scala/Map.scala
+2,src/compiler/scala/Global.scala
+3,src/library/scala/List.scala
+4,test/files/run/t1.scala
+5,src/library/scala/Map.scala
+'''
+
+
+def load_pulls():
+    return pull_aggregates.load_aggregates(), pull_store.load_store()
+
+
+def test_incremental_pull_objects_equal_full_build(files, monkeypatch):
+    monkeypatch.setattr(pull_store, 'PARTITION_DIR', str(files.directory / 'partitions'))
+    counted_in = pull_aggregates.PullAggregates.counted_in
+    updatable = []
+    monkeypatch.setattr(pull_aggregates.PullAggregates, 'counted_in',
+                        lambda self, *frames: updatable.append(counted_in(self, *frames)) or updatable[-1])
+    files.write('pulls_2011-2013.csv', PULLS_ONE)
+    files.write('pulls_2014-2018.csv', PULLS_TWO)
+    files.write('pull_files.csv', PULL_FILES)
+    previous_aggregates, previous_store = served(load_pulls)
+    previous_changes = previous_aggregates.changes
+
+    files.append('pulls_2014-2018.csv', '6,dave,2014-12-31T10:00:00Z\n7,alice,2015-05-05T05:05:05Z\n')
+    files.append('pull_files.csv', '6,src/library/scala/List.scala\n7,README.md\n7,build.sbt\n')
+    served(load_pulls)
+    wait_for_refresh()
+    aggregates, store = served(load_pulls)
+
+    # Updated from the previous versions, left untouched for the runs still served them
+    assert updatable == [True]
+    assert aggregates is not previous_aggregates and previous_aggregates.changes == previous_changes
+    assert store.partitions[2012] is previous_store.partitions[2012]
+    assert 2015 not in previous_store.partitions
+
+    data_loader.invalidate()
+    full_aggregates, full_store = served(load_pulls)
+    assert aggregates is not full_aggregates
+
+    assert sorted(aggregates.pids) == sorted(full_aggregates.pids) == list(range(1, 8))
+    assert aggregates.changes == full_aggregates.changes == 9
+    assert aggregates.user_counts.to_dict() == full_aggregates.user_counts.to_dict()
+    assert aggregates.user_year.to_dict() == full_aggregates.user_year.to_dict()
+
+    assert list(store.partitions) == list(full_store.partitions) == [2012, 2013, 2014, 2015]
+    for year, partition in full_store.partitions.items():
+        assert store.partitions[year].astype({'user': str}).equals(partition.astype({'user': str}))
+    assert store.counts('month').equals(full_store.counts('month'))